@@ -2,77 +2,172 @@
 import streamlit as st
 import io
 import pandas as pd
-from app_details.cleandata_train import manual_train, start_scheduler, stop_scheduler, get_train_log
+from app_details.cleandata_train import manual_train, start_scheduler, stop_scheduler, get_train_log, get_train_runs
 from app_details.cleandata_fixfile import (
-    upload_preclean, process_table_df, get_table_list, export_table_to_df
+    upload_preclean, get_table_list, export_table_to_df
 )
+from app_details.cleandata_batch import FIXED_SUFFIX
+from app_details.job_queue import ACTIVE, cancel_job, ensure_worker, get_job, list_jobs, submit_job
+
+JOB_LABELS = {'train': '모델 학습', 'correct': '보정', 'batch': '일괄 보정'}
+TIER_LABELS = {'interp': '보간', 'model': '모델', 'unfilled': '미보정'}
+TIER_COLUMNS = {'row': '행', 'column': '열', 'gap_length': '결측 길이', 'tier': '보정 방식'}
+STATUS_LABELS = {'queued': '대기', 'running': '실행 중', 'done': '완료', 'failed': '실패', 'cancelled': '취소'}
+
+
+# 작업 현황 (워커 프로세스가 기록하는 진행률). 실행/대기 중인 작업이 있으면 2초마다 이 부분만 다시 그림
+def show_jobs():
+    jobs = list_jobs(limit=10)
+    active = any(job['status'] in ACTIVE for job in jobs)
+
+    @st.fragment(run_every=2 if active else None)
+    def render():
+        current = list_jobs(limit=10)
+        if not current:
+            st.info("실행한 작업이 없습니다.")
+            return
+        for job in current:
+            label = f"#{job['id']} {JOB_LABELS.get(job['kind'], job['kind'])}"
+            if job['kind'] == 'correct':
+                label += f" ({job['params'].get('table')})"
+            status = STATUS_LABELS.get(job['status'], job['status'])
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                if job['status'] in ACTIVE:
+                    step = f" - {job['step']}" if job['step'] else ""
+                    st.progress(job['progress'], text=f"{label}: {status}{step}")
+                else:
+                    st.write(f"{label}: {status} ({job['finished_at']}) {job['message'] or ''}")
+            with col2:
+                if job['status'] in ACTIVE and st.button("취소", key=f"cancel_job_{job['id']}"):
+                    cancel_job(job['id'])
+                    st.rerun()
+        if active and not any(job['status'] in ACTIVE for job in current):
+            st.rerun()  # 작업이 끝나면 결과 영역까지 다시 그림
+
+    render()
+
+# 보정 결과 엑셀은 작업 번호별로 한 번만 만듦 (다시 그릴 때마다 전체 테이블을 읽지 않도록)
+@st.cache_data(max_entries=4, show_spinner="엑셀 파일을 만드는 중...")
+def fixed_table_xlsx(job_id, table):
+    df_fixed = export_table_to_df(table)[0].to_frame()
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df_fixed.to_excel(writer, index=False)
+    return output.getvalue()
 
 def show_cleandata():
     st.title("🛠️ 데이터 보정")
 
+    st.subheader("⏳ 작업 현황")
+    show_jobs()
+
     st.markdown("---")
     st.subheader("✨ 클린 데이터 다운로드")
 
     uploaded_file = st.file_uploader("데이터 파일 업로드", type=['csv','xlsx'])
-    file_path, enc_used, df_preview = upload_preclean(uploaded_file)
+    file_path, enc_used, df_preview, duplicates = upload_preclean(uploaded_file)
     
     if df_preview is not None:
         st.write("전처리된 데이터 미리보기(끝에서 5행)")
         st.dataframe(df_preview)
         st.success(f"데이터가 DB에 저장되었습니다! (인코딩: {enc_used})")
+        if duplicates:
+            st.warning(f"같은 시각이 중복된 {duplicates}행은 마지막 값만 남기고 제외했습니다.")
 
     tables = get_table_list()
     selected_table = st.selectbox("DB에 저장된 데이터 중 보정할 파일 선택", tables)
-    db_df = None
+    target_table = None
     if selected_table:
-        db_df, db_preview = export_table_to_df(selected_table)
-        st.write("선택한 DB 데이터 미리보기(끝에서 5행)")
+        target_table, db_preview = export_table_to_df(selected_table)
+        st.write(f"선택한 DB 데이터 미리보기(끝에서 5행, 전체 {target_table.count():,}행)")
         st.dataframe(db_preview)
 
-    target_df = db_df if db_df is not None else None
-
     # 사용자에게 각 열 인덱스 선택받기 (streamlit selectbox 또는 number_input 활용)
-    col_count = len(target_df.columns) if target_df is not None else 0
+    col_count = len(target_table.columns) if target_table is not None else 0
     t_location = st.number_input("온도(Temperature) 열 인덱스", min_value=0, max_value=col_count-1, value=1)
     h_location = st.number_input("습도(Humidity) 열 인덱스", min_value=0, max_value=col_count-1, value=3)
     r_location = st.number_input("광(Solar_Radiation) 열 인덱스", min_value=0, max_value=col_count-1, value=4)
-    
+    tiered = st.checkbox("짧은 결측은 보간으로 빠르게 보정", value=False,
+                         help="짧은 결측 구간은 보간, 중간 길이만 모델로 예측하고 아주 긴 구간은 그대로 둡니다.")
+
 
+    # 보정은 작업 워커에서 실행하고 결과는 '{테이블}_fixed' 테이블에 저장됨
     if st.button("보정하기"):
-        if target_df is None:
+        if target_table is None:
             st.warning("먼저 파일 업로드 또는 DB에서 파일을 선택해 주세요.")
         else:
-            with st.spinner("파일 보정 중..."):
-                df_fixed, msg = process_table_df(
-                    target_df,
-                    t_location,   # 온도 인덱스
-                    h_location,   # 습도 인덱스
-                    r_location    # 광 인덱스
-                )
-            st.success("보정 작업이 완료되었습니다!")
-            st.info(msg)
-            st.write("보정된 데이터 미리보기(끝에서 5행)")
-            st.dataframe(df_fixed.tail())
-
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df_fixed.to_excel(writer, index=False)
-            output.seek(0)
+            st.session_state.correct_job = submit_job('correct', {
+                'table': selected_table,
+                't_location': int(t_location),   # 온도 인덱스
+                'h_location': int(h_location),   # 습도 인덱스
+                'r_location': int(r_location),   # 광 인덱스
+                'tiered': tiered,
+            })
+            ensure_worker()
+            st.info(f"보정 작업 #{st.session_state.correct_job} 을(를) 대기열에 추가했습니다.")
+
+    correct_job = get_job(st.session_state.correct_job) if 'correct_job' in st.session_state else None
+    if correct_job and correct_job['status'] == 'done':
+        fixed_table = correct_job['result']['table']
+        st.success("보정 작업이 완료되었습니다!")
+        st.info(correct_job['result']['message'])
+        st.write("보정된 데이터 미리보기(끝에서 5행)")
+        st.dataframe(export_table_to_df(fixed_table)[1])
+
+        # 단계별 보정(보간/모델/미보정) 리포트
+        tiers = correct_job['result'].get('tiers')
+        if tiers:
+            st.write("단계별 보정 결과")
+            cols = st.columns(len(tiers['counts']))
+            for col, (tier, count) in zip(cols, tiers['counts'].items()):
+                sec = tiers['timing'].get(tier)
+                col.metric(TIER_LABELS.get(tier, tier), f"{count:,}칸",
+                           f"{sec:.2f}초" if sec is not None else None, delta_color='off')
+            if tiers['cells']:
+                st.dataframe(pd.DataFrame(tiers['cells']).rename(columns=TIER_COLUMNS))
+
+        # 전체 테이블을 읽어 엑셀로 만드는 건 요청할 때만
+        if st.button("다운로드 파일 만들기", key=f"prepare_{correct_job['id']}"):
+            st.session_state.prepared_job = correct_job['id']
+        if st.session_state.get('prepared_job') == correct_job['id']:
             st.download_button(
                 label=":material/download: 보정된 데이터 다운로드",
-                data=output.read(),
-                file_name=f"{selected_table}_cleaned.xlsx",
+                data=fixed_table_xlsx(correct_job['id'], fixed_table),
+                file_name=f"{correct_job['params']['table']}_cleaned.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
 
+    st.markdown("---")
+    st.subheader("📦 일괄 보정")
+
+    batch_tables = st.multiselect(
+        "일괄 보정할 테이블 선택 (비워두면 전체)",
+        [t for t in tables if not t.endswith(FIXED_SUFFIX)]
+    )
+    if st.button("일괄 보정 실행"):
+        st.session_state.batch_job = submit_job('batch', {
+            'tables': batch_tables or None,
+            't_location': int(t_location),
+            'h_location': int(h_location),
+            'r_location': int(r_location),
+        })
+        ensure_worker()
+        st.info(f"일괄 보정 작업 #{st.session_state.batch_job} 을(를) 대기열에 추가했습니다.")
+
+    batch_job = get_job(st.session_state.batch_job) if 'batch_job' in st.session_state else None
+    if batch_job and batch_job['status'] == 'done':
+        summary = batch_job['result']['summary']
+        st.success(f"{summary['tables']}개 테이블, {summary['rows']}행 보정 완료 "
+                   f"({summary['wall_sec']:.1f}초, {summary['rows_per_sec'] or 0:.0f} rows/s)")
+        st.dataframe(pd.DataFrame(batch_job['result']['report']))
+
 
     st.markdown("---")
     st.subheader("🎓 모델 학습")
 
     if st.button("▶️ 수동 학습 실행"):
-        with st.spinner("모델 학습 중... 잠시만 기다려주세요"):
-            msg = manual_train()
-        st.success(msg)
+        st.success(manual_train())
 
     if st.button("🔄 자동 학습 시작"):
         st.success(start_scheduler())
@@ -99,6 +194,20 @@ def show_cleandata():
         else:
             st.info("실행 로그가 없습니다.")
 
+    # 실행별 단계 소요 시간, 검증 RMSE, 예측 지연 (train_runs.jsonl)
+    runs_df = get_train_runs()
+    if not runs_df.empty:
+        st.markdown("##### 학습 실행 기록")
+        st.dataframe(runs_df, hide_index=True)
+
+        trend_col1, trend_col2 = st.columns(2)
+        with trend_col1:
+            st.caption("대상별 검증 RMSE 추이")
+            st.line_chart(runs_df.pivot_table(index='시각', columns='대상', values='val_rmse'))
+        with trend_col2:
+            st.caption("실행별 전체 학습 시간(초) / 예측 ms/행 추이")
+            st.line_chart(runs_df.groupby('시각').agg({'전체(초)': 'first', '예측 ms/행': 'mean'}))
+
 
 if __name__ == "__main__":
     show_cleandata()
@@ -0,0 +1,80 @@
+# cleandata_batch.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from app_details.cleandata_fixfile import get_table_list, process_table_df
+from precleaning.timeseries_db import DB_PATH, ingest_frame, read_range
+FIXED_SUFFIX = '_fixed'
+
+
+# 워커 프로세스: DB 에서 직접 테이블을 읽어 탐지+보정 후 결과와 소요 시간 반환
+def _process_one(table_name, db_path, temp_index, humi_index, light_index, co2_index=None):
+    t0 = time.perf_counter()
+    df = read_range(table_name, db_path=db_path)
+    t1 = time.perf_counter()
+    df_fixed, msg, _ = process_table_df(df, temp_index, humi_index, light_index, co2_index)
+    t2 = time.perf_counter()
+    return table_name, df_fixed, msg, {'read_sec': t1 - t0, 'process_sec': t2 - t1}
+
+
+# 선택한 테이블(없으면 보정 결과 테이블을 뺀 전체)을 프로세스 풀로 일괄 보정
+# 쓰기는 메인 프로세스 하나만 담당해서 '{테이블}_fixed' 로 저장 (연결 관리자의 쓰기 연결, DB 잠금 충돌 방지)
+# progress(완료 수, 전체 수, 테이블) 콜백에서 예외를 내면 아직 시작 안 한 테이블은 취소하고 중단
+def run_batch(tables=None, temp_index=1, humi_index=3, light_index=4,
+              db_path=DB_PATH, max_workers=None, progress=None, co2_index=None):
+    if tables is None:
+        tables = [t for t in get_table_list(db_path) if not t.endswith(FIXED_SUFFIX)]
+    if max_workers is None:
+        max_workers = min(len(tables), os.cpu_count() or 1) or 1
+
+    report = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_process_one, table, db_path, temp_index, humi_index, light_index, co2_index): table
+            for table in tables
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            table = futures[future]
+            try:
+                _, df_fixed, msg, timing = future.result()
+                t0 = time.perf_counter()
+                ingest_frame(df_fixed, f"{table}{FIXED_SUFFIX}", db_path, replace=True)
+                timing['write_sec'] = time.perf_counter() - t0
+                total = timing['read_sec'] + timing['process_sec'] + timing['write_sec']
+                report.append({
+                    'table': table,
+                    'rows': len(df_fixed),
+                    **timing,
+                    'total_sec': total,
+                    'rows_per_sec': len(df_fixed) / total if total > 0 else None,
+                    'message': msg,
+                })
+            except Exception as e:
+                report.append({'table': table, 'rows': 0, 'message': f"실패: {e}"})
+            if progress is not None:
+                try:
+                    progress(done, len(tables), table)
+                except BaseException:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+
+    wall = time.perf_counter() - start
+    report_df = pd.DataFrame(report)
+    total_rows = int(report_df['rows'].sum()) if not report_df.empty else 0
+    summary = {
+        'tables': len(tables),
+        'rows': total_rows,
+        'wall_sec': wall,
+        'rows_per_sec': total_rows / wall if wall > 0 else None,
+        'workers': max_workers,
+    }
+    return report_df, summary
+
+
+if __name__ == "__main__":
+    report_df, summary = run_batch()
+    print(report_df.to_string(index=False))
+    print(f"[완료] {summary['tables']}개 테이블, {summary['rows']}행, "
+          f"{summary['wall_sec']:.1f}초 ({summary['rows_per_sec'] or 0:.0f} rows/s, 워커 {summary['workers']}개)")
@@ -1,14 +1,54 @@
 # cleandata_fixfile.py
 import pandas as pd
+import hashlib
+import json
 import os
-import sqlite3
 from precleaning.incoding import read_csv_robust, clean_for_analysis
+from precleaning.db import get_manager
+from precleaning.timeseries_db import DB_PATH, META_TABLE, TableHandle, ingest_frame
+from utils import get_korea_time
+# 업로드 파일 내용 해시 기록: {테이블: {sha256, size, encoding, rows, ingested_at}}
+INGEST_MANIFEST = 'data/ingest_manifest.json'
 
-def upload_preclean(uploaded_file):
+
+def load_ingest_manifest(path=INGEST_MANIFEST):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_ingest_manifest(manifest, path=INGEST_MANIFEST):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _table_tail(table_name, db_path=DB_PATH, n=5):
+    if table_name not in get_table_list(db_path):
+        return None
+    return TableHandle(table_name, db_path).preview(n)
+
+
+# Streamlit 은 위젯을 건드릴 때마다 다시 실행되고 업로더는 같은 파일을 계속 돌려줌
+# 같은 테이블에 같은 내용(sha256)이 이미 저장돼 있으면 파싱/DB 저장을 건너뛰고 DB 의 끝 5행을 미리보기로 씀
+# 반환: (저장 경로, 인코딩, 미리보기, 같은 시각이 중복돼 제외한 행 수)
+def upload_preclean(uploaded_file, db_path=DB_PATH, manifest_path=INGEST_MANIFEST):
     if uploaded_file is not None:
+        table_name = os.path.splitext(uploaded_file.name)[0]
+        content = uploaded_file.getbuffer()
+        digest = hashlib.sha256(content).hexdigest()
+        manifest = load_ingest_manifest(manifest_path)
+        entry = manifest.get(table_name)
+        if entry and entry['sha256'] == digest and entry['size'] == len(content):
+            preview = _table_tail(table_name, db_path)
+            if preview is not None:
+                return entry.get('path', uploaded_file.name), entry['encoding'], preview, entry.get('duplicates', 0)
+
         path = f"{uploaded_file.name}"
         with open(path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+            f.write(content)
 
         if uploaded_file.type == 'text/csv':
             df_raw, enc = read_csv_robust(path)
@@ -19,34 +59,45 @@ def upload_preclean(uploaded_file):
             df_clean = clean_for_analysis(df_clean)
             enc_used = 'excel'
 
-        conn = sqlite3.connect('codefarmdb.sqlite')
-        table_name = os.path.splitext(uploaded_file.name)[0]
-        df_clean.to_sql(table_name, conn, if_exists='replace', index=False)
-        conn.close()
+        # 같은 테이블이 있으면 시각 기준으로 추가/갱신 (새 날짜 파일이면 행만 늘어남)
+        stats = ingest_frame(df_clean, table_name, db_path)
 
-        return path, enc_used, df_clean.tail()
+        manifest[table_name] = {
+            'sha256': digest,
+            'size': len(content),
+            'encoding': enc_used,
+            'rows': len(df_clean),
+            'duplicates': stats['duplicates'],
+            'path': path,
+            'ingested_at': get_korea_time().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        save_ingest_manifest(manifest, manifest_path)
+        return path, enc_used, df_clean.tail(), stats['duplicates']
     else:
-        return None, None, None
-
-def get_table_list(db_path='codefarmdb.sqlite'):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return tables
-
-def export_table_to_df(table_name, db_path='codefarmdb.sqlite'):
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql(f"SELECT * FROM [{table_name}];", conn)
-    conn.close()
-    return df, df.tail()
-
-def process_table_df(df, temp_index, humi_index, light_index):
+        return None, None, None, 0
+
+def get_table_list(db_path=DB_PATH):
+    cursor = get_manager(db_path).reader().execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name != ?;", (META_TABLE,))
+    return [row[0] for row in cursor.fetchall()]
+
+# 테이블 전체를 읽지 않고 (TableHandle, 끝 5행 미리보기) 반환
+# 전체 데이터는 handle.to_frame(), 큰 테이블은 handle.iter_chunks() 로 나눠 읽음
+def export_table_to_df(table_name, db_path=DB_PATH):
+    handle = TableHandle(table_name, db_path)
+    return handle, handle.preview()
+
+# tiered=True 면 짧은 결측은 보간, 중간 길이만 모델, 긴 구간은 남겨 두는 단계별 보정 사용
+# progress: 보정 예측 진행 콜백 progress(완료 수, 전체 수, 열 이름), 예외를 내면 중단 (작업 취소)
+# 반환: (보정된 df, 메시지, 단계별 보정 리포트(tiered 일 때만, 아니면 None))
+def process_table_df(df, temp_index, humi_index, light_index, co2_index=None, tiered=False, progress=None):
     from outlier_find.find_full import find_outlier_df
     from outlier_fix.predict_full import correct_outlier_df
-    # 이상치 탐지 (index별로)
-    df_found = find_outlier_df(df, temp_index, humi_index, light_index)
+    from outlier_fix.tiered import correct_outlier_tiered
+    # 이상치 탐지 (index별로, CO₂ 는 인덱스를 준 경우만)
+    df_found = find_outlier_df(df, temp_index, humi_index, light_index, co2_index=co2_index)
     # 이상치 보정 (index별로)
-    df_fixed, msg = correct_outlier_df(df_found, temp_index, humi_index, light_index)
-    return df_fixed, msg
+    if tiered:
+        return correct_outlier_tiered(df_found, temp_index, humi_index, light_index, progress=progress)
+    df_fixed, msg = correct_outlier_df(df_found, temp_index, humi_index, light_index, progress=progress)
+    return df_fixed, msg, None
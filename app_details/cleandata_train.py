@@ -2,8 +2,9 @@
 import schedule
 import threading
 import time
-from outlier_fix.train_models import train_model
-from utils import get_korea_time
+from outlier_fix.train_models import read_run_log
+from app_details.job_queue import TRAIN_LOG, ensure_worker, submit_job
+import pandas as pd
 import json
 import os
 
@@ -19,10 +20,11 @@ def load_auto_train_time():
 scheduler_running = False
 scheduler_thread = None
 
+# 야간 자동 학습은 새로 들어온 행만 증분 학습, FULL_REFIT_DAYS 마다 전체 재학습
+# 학습은 작업 워커(job_queue)에서 실행하고, 여기서는 대기열에 넣기만 함
 def job():
-    train_model()
-    with open("outlier_fix/train_log.txt", "a") as f:
-        f.write(f"{get_korea_time().strftime('%Y-%m-%d %H:%M:%S')} (KST)\n")
+    submit_job('train', {'mode': 'auto'})
+    ensure_worker()
 
 def run_scheduler():
     global scheduler_running
@@ -50,15 +52,44 @@ def stop_scheduler():
     return "자동 학습이 중지되었습니다."
 
 def manual_train():
-    train_model()
-    with open("outlier_fix/train_log.txt", "a") as f:
-        f.write(f"{get_korea_time().strftime('%Y-%m-%d %H:%M:%S')} (KST)\n")
-    return "학습이 완료되었습니다!"
+    job_id = submit_job('train', {'mode': 'full'})
+    ensure_worker()
+    return f"학습 작업 #{job_id} 을(를) 대기열에 추가했습니다. 아래 작업 현황에서 진행률을 확인하세요."
 
 def get_train_log():
     try:
-        with open("outlier_fix/train_log.txt", "r") as f:
+        with open(TRAIN_LOG, "r", encoding="utf-8") as f:
             logs = f.readlines()
         return logs[::-1]  # 최신순
     except FileNotFoundError:
         return []
+
+# 학습 실행 기록(JSONL)을 대상별 한 줄 표로 (최신순)
+def get_train_runs():
+    rows = []
+    for record in read_run_log():
+        stages = record.get('stages', {})
+        for target in record.get('targets', []):
+            rows.append({
+                '시각': record['time'],
+                '모드': record.get('mode'),
+                '대상': target['target'],
+                '행 수': target.get('rows'),
+                '특징 수': len(target.get('features') or []),
+                '가지치기': target.get('kept'),
+                'best_iteration': target.get('best_iteration'),
+                'val_rmse': target.get('val_rmse'),
+                '학습(초)': target.get('fit_sec'),
+                '저장(초)': target.get('save_sec'),
+                '모델 크기(KB)': round(target.get('model_bytes', 0) / 1024, 1),
+                '예측 ms/행': target.get('predict_row_ms'),
+                '예측 ms/10k행': target.get('predict_10k_ms'),
+                '예측 스레드': target.get('predict_threads'),
+                '로드(초)': stages.get('load_sec'),
+                '특징 생성(초)': stages.get('features_sec'),
+                '전체(초)': stages.get('total_sec'),
+            })
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df['시각'] = pd.to_datetime(df['시각'])
+    return df
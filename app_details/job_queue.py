@@ -0,0 +1,262 @@
+# job_queue.py
+# 학습/보정처럼 오래 걸리는 작업을 Streamlit 서버 밖의 워커 프로세스에서 실행하는 작업 대기열
+#   - 대기열은 SQLite 파일(JOB_DB)에 저장돼 서버나 워커가 재시작돼도 남음
+#   - 워커는 하나만 실행 (WORKER_LOCK 파일 잠금), 학습은 train_model 안의 잠금으로 한 번에 하나만
+#   - 진행률(0~1)과 현재 대상/테이블 이름을 jobs 테이블에 기록해서 페이지가 읽어 감
+#   - 취소: 대기 중이면 바로 취소, 실행 중이면 취소 요청 → 다음 진행 보고 때 중단
+# 워커 직접 실행: python -m app_details.job_queue
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import traceback
+from utils import LockBusy, file_lock, get_korea_time
+
+JOB_DB = 'data/jobs.sqlite'
+WORKER_LOCK = 'data/jobs.lock'
+TRAIN_LOG = 'outlier_fix/train_log.txt'   # 학습 작업 결과(완료/실패/취소) 한 줄씩, 학습 페이지에서 표시
+POLL_INTERVAL = 1.0
+ACTIVE = ('queued', 'running')
+
+
+# 진행 보고 안의 `except Exception` (예측 실패 처리 등) 에 잡히지 않도록 BaseException 을 상속
+# (asyncio.CancelledError 와 같은 방식)
+class JobCancelled(BaseException):
+    pass
+
+
+def _connect(db_path=JOB_DB):
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress REAL NOT NULL DEFAULT 0,
+            step TEXT,
+            message TEXT,
+            result TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT,
+            started_at TEXT,
+            finished_at TEXT
+        );""")
+    return conn
+
+
+def _now():
+    return get_korea_time().strftime('%Y-%m-%d %H:%M:%S')
+
+
+# 작업 추가 후 작업 번호 반환. 학습은 이미 대기 중인 학습이 있으면 새로 넣지 않고 그 번호를 반환
+def submit_job(kind, params=None, db_path=JOB_DB):
+    conn = _connect(db_path)
+    try:
+        with conn:
+            row = conn.execute("SELECT id FROM jobs WHERE kind = 'train' AND status = 'queued' "
+                               "ORDER BY id LIMIT 1;").fetchone()
+            if row is not None and kind == 'train':
+                return row['id']
+            cur = conn.execute("INSERT INTO jobs (kind, params, created_at) VALUES (?, ?, ?);",
+                               (kind, json.dumps(params or {}, ensure_ascii=False), _now()))
+            return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def cancel_job(job_id, db_path=JOB_DB):
+    conn = _connect(db_path)
+    try:
+        with conn:
+            conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ?, message = '대기 중 취소' "
+                         "WHERE id = ? AND status = 'queued';", (_now(), job_id))
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running';", (job_id,))
+    finally:
+        conn.close()
+
+
+def get_job(job_id, db_path=JOB_DB):
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?;", (job_id,)).fetchone()
+        return _as_dict(row) if row else None
+    finally:
+        conn.close()
+
+
+# 최근 작업 목록 (최신순)
+def list_jobs(limit=20, db_path=JOB_DB):
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?;", (limit,)).fetchall()
+        return [_as_dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def _as_dict(row):
+    job = dict(row)
+    job['params'] = json.loads(job['params'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+# 워커가 살아 있는지 (워커는 실행 중 WORKER_LOCK 을 계속 잡고 있음)
+def worker_alive(lock_path=WORKER_LOCK):
+    try:
+        with file_lock(lock_path, blocking=False):
+            return False
+    except LockBusy:
+        return True
+
+
+# 워커가 없으면 백그라운드 프로세스로 띄움 (Streamlit 페이지에서 호출)
+def ensure_worker(db_path=JOB_DB, lock_path=WORKER_LOCK):
+    if worker_alive(lock_path):
+        return False
+    kwargs = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == 'nt' \
+        else {'start_new_session': True}
+    subprocess.Popen([sys.executable, '-m', 'app_details.job_queue', '--db', db_path, '--lock', lock_path],
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs)
+    return True
+
+
+# ---- 워커 ----
+
+# 작업 종류별 실행 함수: handler(params, progress) → 결과(dict), progress(완료 수, 전체 수, 이름)
+def _run_train(params, progress):
+    from outlier_fix.train_models import train_model
+    report = train_model(mode=params.get('mode', 'full'), progress=progress)
+    return {'targets': [row['target'] for row in report],
+            'val_rmse': {row['target']: row['val_rmse'] for row in report}}
+
+
+# 테이블 하나 보정 → '{테이블}_fixed' 로 저장
+def _run_correct(params, progress):
+    from app_details.cleandata_batch import DB_PATH, FIXED_SUFFIX
+    from app_details.cleandata_fixfile import process_table_df
+    from precleaning.timeseries_db import ingest_frame, read_range
+    db_path = params.get('db_path', DB_PATH)
+    table = params['table']
+    progress(0, 3, table)
+    df = read_range(table, db_path=db_path)
+    progress(1, 3, table)
+    # 보정 예측은 대상 열을 예측할 때마다 1/3 ~ 2/3 사이로 보고 (그때마다 취소 확인)
+    df_fixed, msg, report = process_table_df(
+        df, params['t_location'], params['h_location'], params['r_location'], tiered=params.get('tiered', False),
+        progress=lambda done, total, col: progress(1 + done / total, 3, f"{table} ({col})"))
+    progress(2, 3, table)
+    ingest_frame(df_fixed, f"{table}{FIXED_SUFFIX}", db_path, replace=True)
+    result = {'table': f"{table}{FIXED_SUFFIX}", 'rows': len(df_fixed), 'message': msg}
+    if report is not None:
+        from outlier_fix.tiered import report_to_dict
+        result['tiers'] = report_to_dict(report)
+    return result
+
+
+def _run_batch(params, progress):
+    from app_details.cleandata_batch import DB_PATH, run_batch
+    report_df, summary = run_batch(params.get('tables'), params['t_location'], params['h_location'],
+                                   params['r_location'], db_path=params.get('db_path', DB_PATH), progress=progress)
+    return {'summary': summary, 'report': report_df.to_dict('records')}
+
+
+HANDLERS = {
+    'train': _run_train,
+    'correct': _run_correct,
+    'batch': _run_batch,
+}
+
+
+# 가장 오래된 대기 작업 하나를 실행 중으로 바꾸고 반환 (없으면 None)
+def _claim(conn):
+    with conn:
+        conn.execute("BEGIN IMMEDIATE;")
+        row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1;").fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?;", (_now(), row['id']))
+    return _as_dict(row)
+
+
+def _finish(conn, job_id, status, message=None, result=None):
+    with conn:
+        conn.execute("UPDATE jobs SET status = ?, message = ?, result = ?, finished_at = ?, "
+                     "progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END WHERE id = ?;",
+                     (status, message, json.dumps(result, ensure_ascii=False, default=str) if result else None,
+                      _now(), status, job_id))
+
+
+# 학습 작업은 결과와 상관없이 (예약/수동 모두) TRAIN_LOG 에 한 줄 남김
+def _write_train_log(job, status, message):
+    label = {'done': '완료', 'cancelled': '취소', 'failed': '실패'}[status]
+    line = f"{_now()} (KST) {job['params'].get('mode', 'full')} 학습 {label}"
+    if status == 'failed':
+        line += f" - {message}"
+    with open(TRAIN_LOG, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def run_job(conn, job):
+    def progress(done, total, step):
+        with conn:
+            conn.execute("UPDATE jobs SET progress = ?, step = ? WHERE id = ?;",
+                         (done / total if total else 0, str(step), job['id']))
+        if conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?;", (job['id'],)).fetchone()[0]:
+            raise JobCancelled()
+
+    try:
+        result = HANDLERS[job['kind']](job['params'], progress)
+        status, message = 'done', '완료'
+    except JobCancelled:
+        result, status, message = None, 'cancelled', '실행 중 취소'
+    except Exception as e:
+        traceback.print_exc()
+        result, status, message = None, 'failed', f"{type(e).__name__}: {e}"
+    _finish(conn, job['id'], status, message, result)
+    if job['kind'] == 'train':
+        _write_train_log(job, status, message)
+
+
+# 대기열을 계속 확인하며 작업을 하나씩 실행. 이미 다른 워커가 있으면 바로 반환
+def run_worker(db_path=JOB_DB, lock_path=WORKER_LOCK, interval=POLL_INTERVAL, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    try:
+        with file_lock(lock_path, blocking=False):
+            conn = _connect(db_path)
+            try:
+                # 이전 워커가 실행 도중 죽은 작업은 실패 처리
+                with conn:
+                    conn.execute("UPDATE jobs SET status = 'failed', message = '워커 중단', finished_at = ? "
+                                 "WHERE status = 'running';", (_now(),))
+                while not stop_event.is_set():
+                    job = _claim(conn)
+                    if job is None:
+                        stop_event.wait(interval)
+                        continue
+                    run_job(conn, job)
+            finally:
+                conn.close()
+    except LockBusy:
+        print("[안내] 이미 실행 중인 워커가 있습니다.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="학습/보정 작업 워커")
+    parser.add_argument('--db', default=JOB_DB)
+    parser.add_argument('--lock', default=WORKER_LOCK)
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    run_worker(args.db, args.lock, args.interval, stop)
@@ -0,0 +1,140 @@
+# benchmarks/run_bench.py
+# 사용 예)
+#   python -m benchmarks.run_bench --tiers 1d,7d,30d --stages ingest,detect,correct,train
+#   python -m benchmarks.run_bench --compare benchmarks/results/A.json benchmarks/results/B.json
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.synth import SCALE_TIERS, write_tier
+
+DATA_DIR = 'benchmarks/data'
+RESULT_DIR = 'benchmarks/results'
+STAGES = ['ingest', 'detect', 'correct', 'train']
+# 합성 priva 열 위치 (config/settings.json 기본값과 같음)
+T_INDEX, H_INDEX, L_INDEX = 1, 3, 4
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # 리눅스는 KB, macOS 는 byte 단위
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# 자식 프로세스에서 한 단계만 실행 (단계별 최대 메모리를 따로 재기 위해)
+def _run_stage(stage, path):
+    import pandas as pd
+    from precleaning.incoding import read_csv_robust, clean_for_analysis
+
+    if stage == 'ingest':
+        start = time.perf_counter()
+        df, _ = read_csv_robust(path)
+        df = clean_for_analysis(df)
+        wall = time.perf_counter() - start
+        return {'rows': len(df), 'wall_sec': wall, 'peak_rss_mb': _peak_rss_mb()}
+
+    df = pd.read_csv(path, encoding='utf-8-sig')
+    if stage == 'detect':
+        from outlier_find.find_full import find_outlier_df
+        start = time.perf_counter()
+        find_outlier_df(df, T_INDEX, H_INDEX, L_INDEX)
+        wall = time.perf_counter() - start
+    elif stage == 'correct':
+        from outlier_find.find_full import find_outlier_df
+        from outlier_fix.predict_full import correct_outlier_df
+        df_found = find_outlier_df(df, T_INDEX, H_INDEX, L_INDEX)
+        start = time.perf_counter()
+        correct_outlier_df(df_found, T_INDEX, H_INDEX, L_INDEX)
+        wall = time.perf_counter() - start
+    elif stage == 'train':
+        from outlier_fix.train_models import train_model
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            # 모델과 특징 저장소 모두 임시 폴더에 (실행 이력과 상관없이 매번 빈 저장소에서 시작)
+            train_model(input_file=path, copy_path=os.path.join(tmp, 'copy.xlsx'),
+                        model_dir=os.path.join(tmp, 'models'), store_dir=os.path.join(tmp, 'feature_store'))
+            wall = time.perf_counter() - start
+    else:
+        raise ValueError(f"알 수 없는 단계: {stage}")
+    return {'rows': len(df), 'wall_sec': wall, 'peak_rss_mb': _peak_rss_mb()}
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run_bench(tiers, stages, out_path=None, seed=42):
+    ctx = mp.get_context('spawn')
+    results = []
+    for tier in tiers:
+        path = write_tier('priva', tier, DATA_DIR, seed)
+        for stage in stages:
+            with ctx.Pool(1) as pool:
+                res = pool.apply(_run_stage, (stage, path))
+            res.update({
+                'tier': tier,
+                'stage': stage,
+                'rows_per_sec': res['rows'] / res['wall_sec'] if res['wall_sec'] > 0 else None,
+            })
+            results.append(res)
+            print(f"[{tier:>4}] {stage:<8} {res['rows']:>9}행 {res['wall_sec']:8.3f}초 "
+                  f"{res['rows_per_sec'] or 0:12.0f} rows/s  peak {res['peak_rss_mb']:.0f}MB")
+
+    record = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_rev': _git_rev(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'results': results,
+    }
+    if out_path is None:
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        out_path = os.path.join(RESULT_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {out_path}")
+    return record
+
+
+# 두 결과 파일의 (단계, 규모)별 처리량 비교. ratio < 1 이면 느려진 것
+def compare(base_path, new_path):
+    with open(base_path, encoding='utf-8') as f:
+        base = {(r['tier'], r['stage']): r for r in json.load(f)['results']}
+    with open(new_path, encoding='utf-8') as f:
+        new = {(r['tier'], r['stage']): r for r in json.load(f)['results']}
+    rows = []
+    for key in new:
+        if key in base and base[key]['rows_per_sec'] and new[key]['rows_per_sec']:
+            ratio = new[key]['rows_per_sec'] / base[key]['rows_per_sec']
+            rows.append((*key, base[key]['rows_per_sec'], new[key]['rows_per_sec'], ratio))
+            print(f"[{key[0]:>4}] {key[1]:<8} {rows[-1][2]:12.0f} → {rows[-1][3]:12.0f} rows/s  x{ratio:.2f}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CODEFARM 탐지/보정/학습 처리량 벤치마크")
+    parser.add_argument('--tiers', default='1d,7d,30d',
+                        help=f"쉼표로 구분한 규모 단계 ({', '.join(SCALE_TIERS)})")
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f"쉼표로 구분한 단계 ({', '.join(STAGES)})")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default=None, help="결과 JSON 경로")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="두 결과 파일 비교")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run_bench(args.tiers.split(','), args.stages.split(','), args.out, args.seed)
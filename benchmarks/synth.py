@@ -0,0 +1,145 @@
+# benchmarks/synth.py
+import os
+import numpy as np
+import pandas as pd
+
+# 규모 단계 (1분 간격 행 수 = 일수 x 1440)
+SCALE_TIERS = {
+    '1d': 1,
+    '7d': 7,
+    '30d': 30,
+    '1y': 365,
+    '10y': 3650,
+}
+
+PRIVA_COLUMNS = ['date_time', 'temperature', 'temperature_ds', 'humidity', 'light', 'co2',
+                 'ec', 'ph', 'wet_bulb_temperature', 'dew_point', 'hd', 'vpd']
+MEDIA_COLUMNS = ['date_time', 'medium_weight', 'drain_weight', 'drain_weight_rev',
+                 'irrigation_weight', 'irrigation_weight_rev', 'consumptions', 'light']
+
+
+def _minutes(days, start):
+    return pd.date_range(start, periods=int(days * 1440), freq='min')
+
+
+# 일사량: 낮에만 사인 곡선 + 계절 변화 + 구름(느린 랜덤 변동)
+def _diurnal_light(times, rng, peak=5000.0):
+    hour = times.hour.to_numpy() + times.minute.to_numpy() / 60
+    day_of_year = times.dayofyear.to_numpy()
+    season = 0.75 + 0.25 * np.cos((day_of_year - 172) / 365 * 2 * np.pi)
+    sun = np.clip(np.sin((hour - 6) / 13 * np.pi), 0, None)
+    cloud = 0.8 + 0.2 * np.sin(np.cumsum(rng.normal(0, 0.05, len(times))))
+    return sun * season * cloud * peak
+
+
+def _saturation_vp(temp):
+    return 0.6108 * np.exp(17.27 * temp / (temp + 237.3))
+
+
+# 온실 내부(priva.csv) 모양의 데이터
+# 환기 이벤트(온도 급락 + 습도 급상승), 센서 스파이크, 결측 구간을 일부러 넣음
+def make_priva(days=1, seed=42, start='2025-01-01', spike_rate=5e-4, dropout_rate=2e-4,
+               vent_rate=1e-3, outdoor=False):
+    rng = np.random.default_rng(seed)
+    times = _minutes(days, start)
+    n = len(times)
+    light = _diurnal_light(times, rng, peak=2300.0 if outdoor else 5000.0)
+
+    # 온도: 일사량을 따라가는 1차 지연 + 잡음, 습도는 반대 방향
+    base = 18 + 10 * light / light.max() if n else light
+    temp = pd.Series(base).ewm(span=45).mean().to_numpy() + rng.normal(0, 0.08, n)
+    hum = 85 - 1.6 * (temp - 18) + rng.normal(0, 0.4, n)
+
+    # 환기/난방 이벤트: 10~30분 동안 온도 하강, 습도 상승
+    for start_idx in np.flatnonzero(rng.random(n) < vent_rate):
+        length = rng.integers(10, 30)
+        ramp = np.linspace(0, 1, length)[:n - start_idx]
+        temp[start_idx:start_idx + length] -= 2.5 * ramp
+        hum[start_idx:start_idx + length] += 8 * ramp
+
+    co2 = np.where(light > 0, 600 + rng.normal(0, 20, n), 900 + rng.normal(0, 20, n))
+    hum = np.clip(hum, 5, 100)
+
+    # 스파이크(센서 오류)
+    for values, size in [(temp, 8.0), (hum, 25.0), (light, 6000.0), (co2, 800.0)]:
+        spikes = rng.random(n) < spike_rate
+        values[spikes] += rng.choice([-1, 1], spikes.sum()) * size
+
+    # 결측 구간(통신 끊김): 1~60분
+    for values in (temp, hum, light, co2):
+        for start_idx in np.flatnonzero(rng.random(n) < dropout_rate):
+            values[start_idx:start_idx + rng.integers(1, 60)] = np.nan
+
+    svp = _saturation_vp(temp)
+    vpd = svp * (1 - hum / 100)
+    dew_point = temp - (100 - hum) / 5
+    fmt = '%Y-%m-%d T %H:%M' if outdoor else '%Y-%m-%d %H:%M'
+    df = pd.DataFrame({
+        'date_time': times.strftime(fmt),
+        'temperature': temp.round(2),
+        'temperature_ds': np.nan,
+        'humidity': hum.round(2),
+        'light': light.round(0),
+        'co2': co2.round(0),
+        'ec': np.nan,
+        'ph': np.nan,
+        'wet_bulb_temperature': temp - (temp - dew_point) / 3,
+        'dew_point': dew_point,
+        'hd': vpd * 7.5,
+        'vpd': vpd,
+    })
+    return df[PRIVA_COLUMNS]
+
+
+# 외부 기상(exdata.csv) 모양
+def make_exdata(days=1, seed=43, start='2025-01-01'):
+    return make_priva(days, seed, start, outdoor=True)
+
+
+# 근권부(media.csv) 모양: 배지 무게, 관수/배수 누적
+def make_media(days=1, seed=44, start='2025-01-01'):
+    rng = np.random.default_rng(seed)
+    times = _minutes(days, start)
+    n = len(times)
+    light = _diurnal_light(times, rng)
+    day = np.arange(n) // 1440
+
+    irrigation_event = (light > 500) & (rng.random(n) < 0.01)
+    irrigation = pd.Series(irrigation_event * 150.0).groupby(day).cumsum().to_numpy()
+    drain = (irrigation * 0.3).round(0)
+    consumption = pd.Series(light / 2000).groupby(day).cumsum().to_numpy()
+    weight = 17500 + irrigation - drain - consumption * 30 + rng.normal(0, 2, n)
+
+    df = pd.DataFrame({
+        'date_time': times.strftime('%Y-%m-%d T %H:%M'),
+        'medium_weight': weight.round(0),
+        'drain_weight': drain,
+        'drain_weight_rev': drain,
+        'irrigation_weight': irrigation,
+        'irrigation_weight_rev': irrigation,
+        'consumptions': (irrigation - drain).round(0).astype(int),
+        'light': light.round(1),
+    })
+    return df[MEDIA_COLUMNS]
+
+
+GENERATORS = {
+    'priva': make_priva,
+    'exdata': make_exdata,
+    'media': make_media,
+}
+
+
+# 단계 이름(예: '30d')으로 CSV 를 만들어 out_dir 에 저장하고 경로 반환
+# 파일 이름에 seed 를 넣어 같은 (종류, 단계, seed) 일 때만 만들어 둔 파일을 다시 씀
+def write_tier(kind, tier, out_dir, seed=42):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{kind}_{tier}_s{seed}.csv")
+    if not os.path.exists(path):
+        GENERATORS[kind](SCALE_TIERS[tier], seed).to_csv(path, index=False, encoding='utf-8-sig')
+    return path
+
+
+if __name__ == "__main__":
+    for kind in GENERATORS:
+        print(write_tier(kind, '1d', 'benchmarks/data'))
@@ -0,0 +1,214 @@
+# outlier_find/find_chunked.py
+import itertools
+import os
+import numpy as np
+import pandas as pd
+from outlier_find.hampel import time_steps, window_rows
+from outlier_find.rules import (
+    DEFAULT_RULES, compile_rules, apply_rules, hourly_sums, prepare_block, mark_outliers, with_modes, _diff
+)
+from outlier_find.sketch import QuantileSketch
+from precleaning.timeseries_db import TableHandle
+
+CHUNK_SIZE = 50000
+
+
+# CSV 파일 또는 SQLite 테이블을 chunksize 행씩 읽는 제너레이터 (테이블은 TableHandle 의 키셋 페이지)
+def iter_chunks(source, table=None, chunksize=CHUNK_SIZE, encoding='utf-8-sig'):
+    if table is None:
+        yield from pd.read_csv(source, chunksize=chunksize, encoding=encoding)
+    else:
+        yield from TableHandle(table, source).iter_chunks(chunksize)
+
+
+def read_header(source, table=None, encoding='utf-8-sig'):
+    if table is None:
+        return pd.read_csv(source, nrows=0, encoding=encoding).columns.tolist()
+    return TableHandle(table, source).columns
+
+
+# 청크를 지나가며 전체 데이터 기준 통계(차분 평균/분산, 시간대별 평균, 분위수 스케치)를 누적
+class RuleStatsAccumulator:
+    def __init__(self, compiled):
+        self.compiled = compiled
+        if 'diff_z' in compiled:
+            k = len(compiled['diff_z'][0])
+            self.n = np.zeros(k)
+            self.mean = np.zeros(k)
+            self.m2 = np.zeros(k)
+        if 'hourly_rel' in compiled:
+            k = len(compiled['hourly_rel'][0])
+            self.light_sums = np.zeros((24, k))
+            self.light_counts = np.zeros((24, k))
+        if 'iqr' in compiled:
+            self.sketches = [QuantileSketch(res) for res in compiled['iqr'][1]['resolution']]
+
+    def update(self, block, hours, prev=None):
+        if 'diff_z' in self.compiled:
+            idx = self.compiled['diff_z'][0]
+            d = _diff(block, prev)[:, idx]
+            valid = ~np.isnan(d)
+            b_n = valid.sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                b_mean = np.where(valid, d, 0.0).sum(axis=0) / b_n
+                b_m2 = np.where(valid, (d - b_mean) ** 2, 0.0).sum(axis=0)
+                n = self.n + b_n
+                delta = np.where(b_n > 0, b_mean - self.mean, 0.0)
+                # Chan 병합 공식 (열마다 Welford 상태 갱신)
+                self.mean = np.where(n > 0, self.mean + delta * b_n / n, 0.0)
+                self.m2 = np.where(n > 0, self.m2 + np.where(b_n > 0, b_m2, 0.0) +
+                                   delta ** 2 * self.n * b_n / n, 0.0)
+            self.n = n
+        if 'hourly_rel' in self.compiled and hours is not None:
+            idx = self.compiled['hourly_rel'][0]
+            sums, counts = hourly_sums(block[:, idx], hours)
+            self.light_sums += sums
+            self.light_counts += counts
+        if 'iqr' in self.compiled:
+            idx = self.compiled['iqr'][0]
+            for sketch, col in zip(self.sketches, idx):
+                sketch.update(block[:, col])
+
+    def finalize(self):
+        stats = {}
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if 'diff_z' in self.compiled:
+                std = np.where(self.n > 0, np.sqrt(self.m2 / self.n), np.nan)
+                stats['diff_z'] = (np.where(self.n > 0, self.mean, np.nan), std)
+            if 'hourly_rel' in self.compiled:
+                stats['hourly_rel'] = self.light_sums / self.light_counts
+            if 'iqr' in self.compiled:
+                quartiles = np.array([s.quantile([0.25, 0.75]) for s in self.sketches])
+                stats['iqr'] = (quartiles[:, 0], quartiles[:, 1])
+        return stats
+
+
+# 시각 차이(ns) 값별 개수를 청크마다 누적 → 전체 데이터의 중앙 샘플 간격 (hampel 시간 창 → 행 수)
+# 센서 데이터는 간격 값 종류가 몇 개 안 되므로 개수표만으로 정확한 중앙값을 구함
+class StepCounter:
+    def __init__(self):
+        self.counts = {}
+        self.last = None
+
+    def update(self, times):
+        times = np.asarray(times, dtype='datetime64[ns]')
+        if not len(times):
+            return
+        if self.last is not None:
+            times = np.concatenate([[self.last], times])
+        values, counts = np.unique(time_steps(times), return_counts=True)
+        for value, count in zip(values.tolist(), counts.tolist()):
+            self.counts[value] = self.counts.get(value, 0) + count
+        self.last = times[-1]
+
+    def median(self):
+        if not self.counts:
+            return None
+        keys = sorted(self.counts)
+        cum = np.cumsum([self.counts[k] for k in keys])
+        n = int(cum[-1])
+        at = lambda i: keys[int(np.searchsorted(cum, i, side='right'))]
+        return at(n // 2) if n % 2 else (at(n // 2 - 1) + at(n // 2)) / 2
+
+
+# hampel 시간 창을 전체 데이터 기준 행 수로 고정하고 청크 사이에 겹쳐 읽을 행 수를 반환
+# 이동 중앙값 → 편차의 이동 중앙값(MAD) 두 번이라 한 행의 판정은 앞뒤 (창 - 1) 행에 의존
+def _fix_hampel_windows(compiled, step):
+    if 'hampel' not in compiled:
+        return 0
+    idx, params = compiled['hampel']
+    rows = [window_rows(window, step=step) for window in params['window']]
+    compiled['hampel'] = (idx, dict(params, window=rows))
+    return max(rows) - 1
+
+
+def _concat_blocks(carry, part):
+    if carry is None:
+        return part
+    dataset, hours, block = carry
+    return (pd.concat([dataset, part[0]]), None if hours is None else np.concatenate([hours, part[1]]),
+            np.concatenate([block, part[2]]))
+
+
+def _resolve_columns(columns, temp_index, humi_index, light_index, rules, modes=None):
+    column_map = {
+        'temperature': columns[temp_index],
+        'humidity': columns[humi_index],
+        'light': columns[light_index],
+    }
+    if rules is None:
+        rules = {name: DEFAULT_RULES[name] for name in column_map}
+    else:
+        for name in rules:
+            if name not in column_map and name in columns:
+                column_map[name] = name
+    rules = with_modes(rules, modes)
+    column_map = {name: col for name, col in column_map.items() if name in rules}
+    return {name: rules[name] for name in column_map}, column_map
+
+
+# 큰 CSV/SQLite 테이블을 청크 단위로 두 번 읽어 find_outlier_df 와 같은 결과를 만든다.
+#   1차: 차분 z-score 용 평균/분산, 시간대별 광 평균, IQR 용 분위수 스케치, 샘플 간격 누적
+#   2차: 누적 통계로 청크마다 판정 후 output_path(CSV) 에 이어 쓰기
+#        hampel 규칙이 있으면 청크 경계 앞뒤로 창만큼 겹쳐 읽어서 경계 행도 전체 데이터와 같게 판정
+# modes: {규칙 이름: 'global' | 'hampel'} (find_outlier_df 와 같음)
+# 메모리 사용량은 파일 크기가 아니라 chunksize(+ hampel 창) 에 비례
+def find_outlier_chunked(source, output_path, temp_index, humi_index, light_index,
+                         table=None, chunksize=CHUNK_SIZE, rules=None, modes=None):
+    header = read_header(source, table)
+    rules, column_map = _resolve_columns(header, temp_index, humi_index, light_index, rules, modes)
+    names = list(column_map)
+    data_cols = [column_map[name] for name in names]
+    compiled = compile_rules(rules, names)
+
+    # 1차 패스: 전체 통계
+    acc = RuleStatsAccumulator(compiled)
+    steps = StepCounter()
+    prev = None
+    for chunk in iter_chunks(source, table, chunksize):
+        dataset, hours, block = prepare_block(chunk, data_cols)
+        acc.update(block, hours, prev)
+        if 'hampel' in compiled and hours is not None:
+            steps.update(dataset.index)
+        if len(block):
+            prev = block[-1]
+    stats = acc.finalize()
+    halo = _fix_hampel_windows(compiled, steps.median())
+
+    # 2차 패스: 판정 + 저장
+    # carry: 아직 판정하지 않은 행 + 그 앞의 이미 저장한 halo 행(문맥). done 은 carry 중 저장한 행 수
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    counts = pd.Series(0, index=data_cols)
+    total_rows = 0
+    prev = None
+    carry, done = None, 0
+    for chunk in itertools.chain(iter_chunks(source, table, chunksize), [None]):
+        if chunk is not None:
+            carry = _concat_blocks(carry, prepare_block(chunk, data_cols))
+        if carry is None:
+            break
+        dataset, hours, block = carry
+        # 마지막 halo 행은 뒤 청크를 봐야 판정할 수 있으므로 다음으로 미룸 (끝이면 모두 판정)
+        end = len(block) if chunk is None else max(len(block) - halo, done)
+        if end > done:
+            mask = apply_rules(block, compiled, hours, stats=stats, prev=prev)
+            result, flags = mark_outliers(dataset.iloc[done:end].copy(), block[done:end], mask[done:end],
+                                          data_cols)
+            result.to_csv(output_path, mode='a', index=False,
+                          header=total_rows == 0, encoding='utf-8-sig' if total_rows == 0 else 'utf-8')
+            counts += flags.sum()
+            total_rows += end - done
+        keep = max(end - halo, 0)
+        if keep:
+            prev = block[keep - 1]
+        carry = (dataset.iloc[keep:], None if hours is None else hours[keep:], block[keep:])
+        done = end - keep
+
+    return {'rows': total_rows, 'outliers': counts.to_dict(), 'output_path': output_path}
+
+
+# (아래는 모듈 실행용 샘플, 실제 서비스에서는 사용 안함)
+if __name__ == "__main__":
+    summary = find_outlier_chunked("data/priva.csv", "data/outlier/priva_chunked.csv", 1, 3, 4)
+    print(summary)
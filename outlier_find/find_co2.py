@@ -0,0 +1,83 @@
+# outlier_find/find_co2.py
+import numpy as np
+import pandas as pd
+from outlier_find.rules import DEFAULT_RULES, compile_rules, apply_rules, prepare_block
+from outlier_find.find_chunked import RuleStatsAccumulator
+from outlier_find.sketch import QuantileSketch
+
+# CO₂ 이상치: IQR + 물리 범위(300~2000ppm) + 직전 대비 500ppm 이상 급락
+CO2_RULES = DEFAULT_RULES['co2']
+
+
+# 청크(배열) 묶음을 한 번만 훑어 CO₂ 사분위수 (Q1, Q3) 계산
+def co2_quartiles(chunks, resolution=1):
+    sketch = QuantileSketch(resolution)
+    for values in chunks:
+        sketch.update(pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float))
+    q1, q3 = sketch.quantile([0.25, 0.75])
+    return q1, q3
+
+
+# CO₂ 시리즈 → 이상치 여부(bool Series)
+# quartiles 를 주면(대용량 파일을 청크로 미리 계산한 경우 등) 그 값을 IQR 기준으로 사용
+def find_co2_outlier(co2, quartiles=None):
+    block = pd.to_numeric(co2, errors='coerce').to_numpy(dtype=float).reshape(-1, 1)
+    compiled = compile_rules({'co2': CO2_RULES}, ['co2'])
+    stats = None
+    if quartiles is not None:
+        stats = {'iqr': (np.array([quartiles[0]]), np.array([quartiles[1]]))}
+    mask = apply_rules(block, compiled, stats=stats)
+    return pd.Series(mask[:, 0], index=co2.index)
+
+
+# 전체(또는 청크로 나눈) 과거 데이터에서 실시간 판정에 쓸 통계를 미리 계산
+# 반환값은 check_latest_row 의 stats 로 그대로 넘기면 됨
+def compute_latest_stats(chunks, column_map, rules=None):
+    if rules is None:
+        rules = DEFAULT_RULES
+    names = [name for name in column_map if name in rules]
+    compiled = compile_rules({name: rules[name] for name in names}, names)
+    acc = RuleStatsAccumulator(compiled)
+    data_cols = [column_map[name] for name in names]
+    prev = None
+    for chunk in chunks:
+        _, hours, block = prepare_block(chunk, data_cols)
+        acc.update(block, hours, prev)
+        if len(block):
+            prev = block[-1]
+    return acc.finalize()
+
+
+# 실시간(마지막 행) 오류 감지 빠른 경로
+# df 는 마지막 두 행만 있어도 됨 (직전 행은 차분용)
+# stats 는 compute_latest_stats 로 미리 계산해 두고 매번 그대로 넘김 (행마다 전체 데이터를 다시 훑지 않도록)
+# 반환: {'date_time': 시각, 규칙 이름: {'value': 값, 'fault': 오류 여부}, ...}
+def check_latest_row(df, stats, column_map=None, rules=None):
+    if rules is None:
+        rules = DEFAULT_RULES
+    if column_map is None:
+        column_map = {name: name for name in rules if name in df.columns}
+    names = [name for name in column_map if name in rules]
+    data_cols = [column_map[name] for name in names]
+
+    tail = df.tail(2)
+    dataset, hours, block = prepare_block(tail, data_cols)
+    compiled = compile_rules({name: rules[name] for name in names}, names)
+    # 직전 행 없이 마지막 행만 판정 (직전 행은 차분 계산에만 사용)
+    prev = block[-2] if len(block) > 1 else None
+    last_hours = hours[-1:] if hours is not None else None
+    mask = apply_rules(block[-1:], compiled, last_hours, stats=stats, prev=prev)
+
+    result = {'date_time': dataset.index[-1]}
+    for i, name in enumerate(names):
+        result[name] = {'value': block[-1, i], 'fault': bool(mask[0, i])}
+    return result
+
+
+# (아래는 모듈 실행용 샘플, 실제 서비스에서는 사용 안함)
+if __name__ == "__main__":
+    df = pd.read_csv("data/priva.csv")
+    print(find_co2_outlier(df['co2']).sum())
+    column_map = {'temperature': 'temperature', 'humidity': 'humidity', 'light': 'light', 'co2': 'co2'}
+    stats = compute_latest_stats([df.iloc[:-1]], column_map)
+    print(check_latest_row(df, stats, column_map))
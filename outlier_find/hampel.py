@@ -0,0 +1,51 @@
+# outlier_find/hampel.py
+import numpy as np
+import pandas as pd
+
+try:
+    import bottleneck as bn
+except ImportError:
+    bn = None
+
+MAD_SCALE = 1.4826  # 정규분포에서 MAD → 표준편차 환산 계수
+
+
+# 시각 배열 → 이웃 시각 차이(ns) 배열
+def time_steps(times):
+    return np.diff(np.asarray(times, dtype='datetime64[ns]')).astype(np.int64)
+
+
+# '60min' 같은 시간 창을 중앙값 샘플 간격 기준 행 개수(홀수)로 변환
+# step: 미리 구한 중앙값 샘플 간격(ns). 주면 times 대신 사용 (청크 모드)
+def window_rows(window, times=None, step=None):
+    if isinstance(window, (int, np.integer)):
+        rows = int(window)
+    else:
+        if step is None:
+            if times is None or len(times) < 2:
+                raise ValueError("시간 창을 쓰려면 date_time 열이 필요합니다.")
+            step = np.median(time_steps(times))
+        rows = int(round(pd.Timedelta(window).value / max(step, 1)))
+    rows = max(rows, 3)
+    return rows if rows % 2 == 1 else rows + 1
+
+
+# 열마다 중앙 정렬 이동 중앙값 (NaN 무시)
+# bottleneck 이 있으면 이중 힙 O(n log w), 없으면 pandas rolling(skiplist) 사용
+def rolling_median(block, rows):
+    half = rows // 2
+    if bn is not None:
+        padded = np.concatenate([block, np.full((half, block.shape[1]), np.nan)])
+        return bn.move_median(padded, rows, min_count=1, axis=0)[half:]
+    return pd.DataFrame(block).rolling(rows, center=True, min_periods=1).median().to_numpy()
+
+
+# Hampel 필터: |x - 이동 중앙값| > thresh * 1.4826 * 이동 MAD 인 셀을 True 로 반환
+# min_scale: 값이 거의 일정한 구간(MAD≈0)에서 작은 흔들림까지 잡지 않도록 하는 하한
+def hampel_mask(block, rows, thresh=3.5, min_scale=0.0):
+    med = rolling_median(block, rows)
+    dev = np.abs(block - med)
+    mad = rolling_median(dev, rows)
+    scale = np.maximum(MAD_SCALE * mad, min_scale)
+    with np.errstate(invalid='ignore'):
+        return dev > thresh * scale
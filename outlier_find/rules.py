@@ -0,0 +1,308 @@
+# outlier_find/rules.py
+import warnings
+import numpy as np
+import pandas as pd
+from outlier_find.hampel import window_rows, hampel_mask
+
+# 열 이름별 이상치 규칙 선언
+#   range       : 물리적 범위 (min/max 중 하나만 있어도 됨)
+#   diff_z      : 차분 z-score, exclude_opposite 열과 차분 부호가 반대면(환기/난방) 제외
+#   iqr         : Q1 - k*IQR ~ Q3 + k*IQR 벗어남 (메모리 안의 데이터는 정확한 분위수,
+#                 청크/스트리밍 통계는 resolution 단위 스케치로 계산)
+#   hourly_rel  : 시간대 평균 대비 upper 배 초과 / lower 배 미만 (평균 min_mean 이하 시간대 제외)
+#   max_drop    : 직전 대비 drop 이상 급락
+#   hampel      : 이동 중앙값/MAD 기준 국소 이상치 (window 시간 창, 전역 diff_z 대신 선택 가능)
+DEFAULT_RULES = {
+    'temperature': [
+        {'rule': 'range', 'min': -10, 'max': 40},
+        {'rule': 'diff_z', 'thresh': 4, 'exclude_opposite': 'humidity'},
+    ],
+    'humidity': [
+        {'rule': 'range', 'min': 0, 'max': 100},
+        {'rule': 'diff_z', 'thresh': 4, 'exclude_opposite': 'temperature'},
+    ],
+    'light': [
+        {'rule': 'range', 'min': 0, 'max': 20000},
+        {'rule': 'hourly_rel', 'upper': 1.7, 'lower': 0.3, 'min_mean': 50},
+        {'rule': 'range', 'max': 5400},
+    ],
+    'co2': [
+        {'rule': 'iqr', 'k': 1.5, 'resolution': 1},
+        {'rule': 'range', 'min': 300, 'max': 2000},
+        {'rule': 'max_drop', 'drop': 500},
+    ],
+    'ec': [
+        {'rule': 'range', 'min': 0, 'max': 10},
+        {'rule': 'diff_z', 'thresh': 6},
+    ],
+    'ph': [
+        {'rule': 'range', 'min': 0, 'max': 14},
+        {'rule': 'diff_z', 'thresh': 6},
+    ],
+    'vpd': [
+        {'rule': 'range', 'min': 0, 'max': 10},
+        {'rule': 'diff_z', 'thresh': 6},
+    ],
+}
+
+RULE_TYPES = ['range', 'diff_z', 'iqr', 'hourly_rel', 'max_drop', 'hampel']
+
+# 열별 국소(hampel) 모드 기본값. min_scale 은 각 센서 단위 기준 최소 편차
+HAMPEL_DEFAULTS = {
+    'temperature': {'rule': 'hampel', 'window': '60min', 'thresh': 4, 'min_scale': 0.2,
+                    'exclude_opposite': 'humidity'},
+    'humidity': {'rule': 'hampel', 'window': '60min', 'thresh': 4, 'min_scale': 1.0,
+                 'exclude_opposite': 'temperature'},
+}
+
+
+# modes: {열 이름: 'global' | 'hampel'}
+# 'hampel' 로 지정한 열은 전역 diff_z 규칙을 이동 중앙값/MAD 규칙으로 바꿈
+def with_modes(rules, modes=None):
+    if not modes:
+        return rules
+    result = {}
+    for name, col_rules in rules.items():
+        if modes.get(name, 'global') == 'hampel':
+            local = HAMPEL_DEFAULTS.get(name, {'rule': 'hampel', 'window': '60min', 'thresh': 4})
+            col_rules = [dict(local, exclude_opposite=spec.get('exclude_opposite'))
+                         if spec['rule'] == 'diff_z' else spec for spec in col_rules]
+            if not any(spec['rule'] == 'hampel' for spec in col_rules):
+                col_rules = col_rules + [local]
+        result[name] = col_rules
+    return result
+
+
+# 규칙 선언을 규칙 종류별 (열 위치 배열, 파라미터 배열) 묶음으로 변환
+# 같은 종류의 규칙은 열 개수와 상관없이 한 번의 NumPy 연산으로 계산됨
+def compile_rules(rules, columns):
+    col_pos = {col: i for i, col in enumerate(columns)}
+    groups = {rule_type: [] for rule_type in RULE_TYPES}
+    for col, col_rules in rules.items():
+        if col not in col_pos:
+            continue
+        for spec in col_rules:
+            rule_type = spec['rule']
+            if rule_type not in groups:
+                raise ValueError(f"알 수 없는 규칙: {rule_type} ({col})")
+            groups[rule_type].append((col_pos[col], spec))
+
+    compiled = {}
+    for rule_type, items in groups.items():
+        if not items:
+            continue
+        idx = np.array([pos for pos, _ in items])
+        specs = [spec for _, spec in items]
+        if rule_type == 'range':
+            params = {
+                'low': np.array([s.get('min', -np.inf) for s in specs], dtype=float),
+                'high': np.array([s.get('max', np.inf) for s in specs], dtype=float),
+            }
+        elif rule_type == 'diff_z':
+            # 짝 열이 데이터에 없으면 -1 (제외 조건 없음)
+            params = {
+                'thresh': np.array([s.get('thresh', 4) for s in specs], dtype=float),
+                'pair': np.array([col_pos.get(s.get('exclude_opposite'), -1) for s in specs]),
+            }
+        elif rule_type == 'hampel':
+            params = {
+                'window': [s.get('window', '60min') for s in specs],
+                'thresh': np.array([s.get('thresh', 4) for s in specs], dtype=float),
+                'min_scale': np.array([s.get('min_scale', 0.0) for s in specs], dtype=float),
+                'pair': np.array([col_pos.get(s.get('exclude_opposite'), -1) for s in specs]),
+            }
+        elif rule_type == 'iqr':
+            params = {
+                'k': np.array([s.get('k', 1.5) for s in specs], dtype=float),
+                'resolution': [s.get('resolution', 0.01) for s in specs],
+            }
+        elif rule_type == 'hourly_rel':
+            params = {
+                'upper': np.array([s.get('upper', 1.7) for s in specs], dtype=float),
+                'lower': np.array([s.get('lower', 0.3) for s in specs], dtype=float),
+                'min_mean': np.array([s.get('min_mean', 50) for s in specs], dtype=float),
+            }
+        else:
+            params = {'drop': np.array([s.get('drop', 500) for s in specs], dtype=float)}
+        compiled[rule_type] = (idx, params)
+    return compiled
+
+
+# prev: 앞 청크의 마지막 행 (청크 경계에서도 차분이 이어지도록)
+def _diff(block, prev=None):
+    diff = np.empty_like(block)
+    diff[0] = np.nan if prev is None else block[0] - prev
+    np.subtract(block[1:], block[:-1], out=diff[1:])
+    return diff
+
+
+# 짝 열과 차분 부호가 반대인 정상 환경 변화(환기/난방) 구간
+def _normal_env(diff, idx, pair):
+    has_pair = pair >= 0
+    if not has_pair.any():
+        return np.zeros((diff.shape[0], len(idx)), dtype=bool)
+    pair_diff = diff[:, np.where(has_pair, pair, 0)]
+    return (diff[:, idx] * pair_diff < 0) & has_pair
+
+
+# 열마다 정확한 (Q1 배열, Q3 배열) 계산 (pandas quantile 과 같은 linear 보간)
+def iqr_quartiles(sub):
+    q1, q3 = np.nanpercentile(sub, [25, 75], axis=0)
+    return q1, q3
+
+
+# 시간대(0~23)별 합계/개수 (열마다). 시각이 없는 행(NaT → hours 가 NaN)은 빼고 셈
+def hourly_sums(sub, hours):
+    valid = ~np.isnan(hours)
+    h = hours[valid].astype(int)
+    ok = ~np.isnan(sub[valid])
+    sums = np.zeros((24, sub.shape[1]))
+    counts = np.zeros((24, sub.shape[1]))
+    np.add.at(sums, h, np.where(ok, sub[valid], 0.0))
+    np.add.at(counts, h, ok)
+    return sums, counts
+
+
+# 행마다 해당 시간대의 평균 (시각이 없는 행은 NaN → hourly_rel 규칙에 걸리지 않음)
+def hourly_mean_at(table, hours, shape):
+    valid = ~np.isnan(hours)
+    hourly_mean = np.full(shape, np.nan)
+    hourly_mean[valid] = table[hours[valid].astype(int)]
+    return hourly_mean
+
+
+# 2차원 float 블록(행 x 열)에 컴파일된 규칙을 적용해 같은 모양의 bool 마스크 반환
+# stats 를 주면 블록에서 통계를 다시 구하지 않고 그 값(전체 데이터 기준)을 사용
+#   {'diff_z': (평균, 표준편차), 'iqr': (Q1, Q3), 'hourly_rel': 24 x 열 시간대 평균}
+# times 는 hampel 규칙의 시간 창을 행 개수로 바꿀 때 사용
+def apply_rules(block, compiled, hours=None, stats=None, prev=None, times=None):
+    n_rows, n_cols = block.shape
+    mask = np.zeros((n_rows, n_cols), dtype=bool)
+    if n_rows == 0:
+        return mask
+    diff = None
+
+    # 값이 전부 비어 있는 열(ec, ph 등)의 nanmean/nanpercentile 경고는 무시
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for rule_type, (idx, params) in compiled.items():
+            sub = block[:, idx]
+
+            if rule_type == 'range':
+                flags = (sub < params['low']) | (sub > params['high'])
+
+            elif rule_type == 'diff_z':
+                if diff is None:
+                    diff = _diff(block, prev)
+                d = diff[:, idx]
+                if stats is not None and 'diff_z' in stats:
+                    mean, std = stats['diff_z']
+                else:
+                    # scipy zscore(nan_policy='omit') 와 동일 (ddof=0)
+                    mean, std = np.nanmean(d, axis=0), np.nanstd(d, axis=0)
+                z = (d - mean) / std
+                flags = np.abs(z) > params['thresh']
+                flags &= ~_normal_env(diff, idx, params['pair'])
+
+            elif rule_type == 'hampel':
+                if diff is None:
+                    diff = _diff(block, prev)
+                flags = np.zeros(sub.shape, dtype=bool)
+                # 창 크기가 같은 열끼리 묶어서 한 번에 계산
+                windows = params['window']
+                for window in dict.fromkeys(windows):
+                    cols = np.array([w == window for w in windows])
+                    rows = window_rows(window, times)
+                    flags[:, cols] = hampel_mask(sub[:, cols], rows, params['thresh'][cols],
+                                                 params['min_scale'][cols])
+                flags &= ~_normal_env(diff, idx, params['pair'])
+
+            elif rule_type == 'iqr':
+                if stats is not None and 'iqr' in stats:
+                    q1, q3 = stats['iqr']
+                else:
+                    q1, q3 = iqr_quartiles(sub)
+                iqr = q3 - q1
+                flags = (sub < q1 - params['k'] * iqr) | (sub > q3 + params['k'] * iqr)
+
+            elif rule_type == 'hourly_rel':
+                if hours is None:
+                    continue
+                if stats is not None and 'hourly_rel' in stats:
+                    hourly_mean = hourly_mean_at(stats['hourly_rel'], hours, sub.shape)
+                else:
+                    sums, counts = hourly_sums(sub, hours)
+                    hourly_mean = hourly_mean_at(sums / counts, hours, sub.shape)
+                valid_hour = hourly_mean > params['min_mean']
+                flags = valid_hour & ((sub > hourly_mean * params['upper']) |
+                                      (sub < hourly_mean * params['lower']))
+
+            else:  # max_drop
+                if diff is None:
+                    diff = _diff(block, prev)
+                flags = diff[:, idx] < -params['drop']
+
+            # 같은 열에 같은 종류 규칙이 여러 개면 OR 로 합침
+            order = np.argsort(idx, kind='stable')
+            sorted_idx = idx[order]
+            starts = np.flatnonzero(np.r_[True, sorted_idx[1:] != sorted_idx[:-1]])
+            merged = np.logical_or.reduceat(flags[:, order], starts, axis=1)
+            mask[:, sorted_idx[starts]] |= merged
+
+    return mask
+
+
+# column_map: {규칙 이름: 실제 데이터 열 이름}. 없으면 규칙 이름과 같은 열을 사용
+# 반환: (이상치를 NaN 으로 바꾼 데이터셋, 열별 이상치 마스크 DataFrame)
+# modes: {규칙 이름: 'global' | 'hampel'} (with_modes 참고)
+def find_outlier_rules_df(df, rules=None, column_map=None, modes=None):
+    if rules is None:
+        rules = DEFAULT_RULES
+    rules = with_modes(rules, modes)
+    if column_map is None:
+        column_map = {name: name for name in rules}
+    column_map = {name: col for name, col in column_map.items()
+                  if name in rules and col in df.columns}
+
+    names = list(column_map)
+    dataset, hours, block = prepare_block(df, [column_map[name] for name in names])
+    # exclude_opposite 도 규칙 이름 기준이므로 이름 목록으로 컴파일
+    compiled = compile_rules({name: rules[name] for name in names}, names)
+    times = dataset.index if hours is not None else None
+    mask = apply_rules(block, compiled, hours, times=times)
+    return mark_outliers(dataset, block, mask, [column_map[name] for name in names])
+
+
+# 시간 인덱스 설정 + 대상 열 숫자 변환 후 (데이터셋, 시간대 배열, float 블록) 반환
+def prepare_block(df, data_cols):
+    dataset = df.copy()
+    if 'date_time' in dataset.columns:
+        # 읽을 수 없는 시각(빈칸, 깨진 문자열)은 NaT → hours 가 NaN 이라 시간대 통계/판정에서 빠짐
+        dataset['date_time'] = pd.to_datetime(dataset['date_time'], format='mixed', errors='coerce')
+        dataset = dataset.set_index('date_time')
+        hours = dataset.index.hour.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        dataset.index = pd.RangeIndex(len(dataset))
+        hours = None
+
+    for col in data_cols:
+        dataset[col] = pd.to_numeric(dataset[col], errors='coerce')
+    block = dataset[data_cols].to_numpy(dtype=float)
+    return dataset, hours, block
+
+
+# 마스크된 셀을 NaN 으로 바꾸고 인덱스를 복구 (다운로드를 위해)
+def mark_outliers(dataset, block, mask, data_cols):
+    marked = block.copy()
+    marked[mask] = np.nan
+    dataset[data_cols] = marked
+    flags = pd.DataFrame(mask, columns=data_cols)
+    dataset = dataset.reset_index()
+    return dataset, flags
+
+
+# (아래는 모듈 실행용 샘플, 실제 서비스에서는 사용 안함)
+if __name__ == "__main__":
+    df = pd.read_csv("data/priva.csv")
+    result, flags = find_outlier_rules_df(df)
+    print(flags.sum())
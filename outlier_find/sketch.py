@@ -0,0 +1,53 @@
+# outlier_find/sketch.py
+import numpy as np
+
+
+# 고정 폭(resolution) 구간별 개수를 세는 병합 가능한 분위수 스케치
+# 값이 resolution 단위로 기록된 센서(CO₂ 1ppm, 온도 0.01℃ 등)는 numpy 'linear' 분위수와 같은 값을 준다.
+# 메모리는 행 수가 아니라 서로 다른 구간 수에 비례해서 청크 단위로 한 번만 훑으면 됨
+class QuantileSketch:
+    def __init__(self, resolution=0.01):
+        self.resolution = resolution
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def _merge(self, keys, counts):
+        all_keys = np.concatenate([self.keys, keys])
+        all_counts = np.concatenate([self.counts, counts])
+        self.keys, inverse = np.unique(all_keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=all_counts).astype(np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        # 부동소수 오차로 0.999.. 처럼 내려가지 않도록 반올림 후 내림
+        keys = np.floor(np.round(values / self.resolution, 6)).astype(np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+        self._merge(keys, counts)
+        return self
+
+    def merge(self, other):
+        self._merge(other.keys, other.counts)
+        return self
+
+    def quantile(self, qs):
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        n = self.n
+        if n == 0:
+            return np.full(qs.shape, np.nan)
+        cum = np.cumsum(self.counts)
+        values = self.keys * self.resolution
+
+        # numpy 'linear' 방식: 순위 q*(n-1) 앞뒤 값 사이 보간
+        rank = qs * (n - 1)
+        lo = np.floor(rank).astype(np.int64)
+        hi = np.minimum(lo + 1, n - 1)
+        v_lo = values[np.searchsorted(cum, lo, side='right')]
+        v_hi = values[np.searchsorted(cum, hi, side='right')]
+        return v_lo + (rank - lo) * (v_hi - v_lo)
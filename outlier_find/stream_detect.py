@@ -0,0 +1,247 @@
+# outlier_find/stream_detect.py
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# find_full.find_outlier_df 와 동일한 기준값
+TEMP_MIN, TEMP_MAX = -10, 40
+HUM_MIN, HUM_MAX = 0, 100
+LIGHT_MIN, LIGHT_MAX = 0, 20000
+LIGHT_UPPER_SUS = 5400
+Z_THRESH = 4
+MEAN_EPS = 50
+UPPER_RATIO = 1.7
+LOWER_RATIO = 0.3
+
+
+class RunningStats:
+    # Welford 평균/분산 (묶음 단위 갱신은 Chan 병합 공식 사용)
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        b_n = values.size
+        b_mean = values.mean()
+        b_m2 = ((values - b_mean) ** 2).sum()
+        n = self.n + b_n
+        delta = b_mean - self.mean
+        self.mean += delta * b_n / n
+        self.m2 += b_m2 + delta ** 2 * self.n * b_n / n
+        self.n = n
+
+    @property
+    def std(self):
+        # scipy zscore 와 같은 모표준편차(ddof=0)
+        if self.n == 0:
+            return np.nan
+        return np.sqrt(self.m2 / self.n)
+
+    def zscore(self, values):
+        std = self.std
+        if not std or np.isnan(std):
+            return np.full(np.shape(values), np.nan)
+        return (np.asarray(values, dtype=float) - self.mean) / std
+
+    def to_dict(self):
+        return {'n': self.n, 'mean': self.mean, 'm2': self.m2}
+
+
+# 새로 들어온 행(또는 작은 묶음)만 보고 이상치를 판정하는 온라인 탐지기.
+# 차분 평균/분산, 직전 값, 시간대별 광 평균을 상태로 들고 있어서
+# 전체 테이블을 다시 읽지 않고 find_outlier_df 와 같은 규칙을 적용한다.
+class StreamingOutlierDetector:
+    def __init__(self, temp_col='temperature', humi_col='humidity', light_col='light',
+                 time_col='date_time', z_thresh=Z_THRESH, min_count=30):
+        self.temp_col = temp_col
+        self.humi_col = humi_col
+        self.light_col = light_col
+        self.time_col = time_col
+        self.z_thresh = z_thresh
+        # 차분 통계가 충분히 쌓이기 전에는 z-score 규칙을 쓰지 않음
+        self.min_count = min_count
+
+        self.temp_stats = RunningStats()
+        self.hum_stats = RunningStats()
+        self.last_temp = np.nan
+        self.last_hum = np.nan
+        self.light_sum = np.zeros(24)
+        self.light_cnt = np.zeros(24)
+        self.rows_seen = 0
+
+    # ---------- 내부 계산 ----------
+    def _diffs(self, temp, hum):
+        diff_temp = np.diff(np.concatenate(([self.last_temp], temp)))
+        diff_hum = np.diff(np.concatenate(([self.last_hum], hum)))
+        return diff_temp, diff_hum
+
+    def _classify(self, hours, temp, hum, light, learn=True):
+        diff_temp, diff_hum = self._diffs(temp, hum)
+
+        if learn:
+            self.temp_stats.update(diff_temp)
+            self.hum_stats.update(diff_hum)
+            if hours is not None:
+                # 시각이 없는 행(NaT → hours 가 NaN)은 시간대 통계에서 뺌
+                ok = ~np.isnan(light) & ~np.isnan(hours)
+                h = hours[ok].astype(int)
+                self.light_sum += np.bincount(h, weights=light[ok], minlength=24)
+                self.light_cnt += np.bincount(h, minlength=24)
+            if temp.size:
+                self.last_temp = temp[-1]
+                self.last_hum = hum[-1]
+            self.rows_seen += temp.size
+
+        with np.errstate(invalid='ignore'):
+            # 1. 온도/습도: 물리 범위 + 차분 z-score (정상 환기/난방 패턴 제외)
+            temp_physical = (temp < TEMP_MIN) | (temp > TEMP_MAX)
+            hum_physical = (hum < HUM_MIN) | (hum > HUM_MAX)
+
+            if self.temp_stats.n >= self.min_count:
+                cond_temp_diff = np.abs(self.temp_stats.zscore(diff_temp)) > self.z_thresh
+            else:
+                cond_temp_diff = np.zeros(temp.size, dtype=bool)
+            if self.hum_stats.n >= self.min_count:
+                cond_hum_diff = np.abs(self.hum_stats.zscore(diff_hum)) > self.z_thresh
+            else:
+                cond_hum_diff = np.zeros(hum.size, dtype=bool)
+
+            normal_env = ((diff_temp < 0) & (diff_hum > 0)) | ((diff_temp > 0) & (diff_hum < 0))
+
+            temp_fault = temp_physical | (cond_temp_diff & ~normal_env)
+            hum_fault = hum_physical | (cond_hum_diff & ~normal_env)
+
+            # 2. 광: 물리 범위 + 시간대 평균 대비 + 5400 초과
+            light_physical = (light < LIGHT_MIN) | (light > LIGHT_MAX)
+            if hours is not None:
+                # 시각이 없는 행은 시간대 평균이 NaN → 시간대 규칙에 걸리지 않음
+                known = ~np.isnan(hours)
+                hourly_mean = np.full(light.size, np.nan)
+                hourly_mean[known] = self.hourly_mean()[hours[known].astype(int)]
+                valid_hour = hourly_mean > MEAN_EPS
+                light_rel = valid_hour & ((light > hourly_mean * UPPER_RATIO) |
+                                          (light < hourly_mean * LOWER_RATIO))
+            else:
+                light_rel = np.zeros(light.size, dtype=bool)
+            light_outlier = light_physical | light_rel | (light > LIGHT_UPPER_SUS)
+
+        return temp_fault, hum_fault, light_outlier
+
+    def _arrays(self, df):
+        temp = pd.to_numeric(df[self.temp_col], errors='coerce').to_numpy(dtype=float)
+        hum = pd.to_numeric(df[self.humi_col], errors='coerce').to_numpy(dtype=float)
+        light = pd.to_numeric(df[self.light_col], errors='coerce').to_numpy(dtype=float)
+        if self.time_col in df.columns:
+            times = pd.to_datetime(df[self.time_col], format='mixed', errors='coerce')
+            hours = times.dt.hour.to_numpy(dtype=float, na_value=np.nan)
+        else:
+            hours = None
+        return hours, temp, hum, light
+
+    # ---------- 공개 API ----------
+    def hourly_mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.light_sum / self.light_cnt
+
+    # 과거 데이터로 상태만 채움 (판정 결과는 버림)
+    def warm_start(self, df):
+        hours, temp, hum, light = self._arrays(df)
+        self._classify(hours, temp, hum, light, learn=True)
+        return self
+
+    # 새 묶음을 판정하고 상태에 반영.
+    # find_outlier_df 처럼 이상치 셀을 NaN 으로 바꾼 복사본과 열별 플래그를 반환
+    def update(self, df):
+        hours, temp, hum, light = self._arrays(df)
+        temp_fault, hum_fault, light_outlier = self._classify(hours, temp, hum, light)
+
+        dataset = df.copy()
+        for col in [self.temp_col, self.humi_col, self.light_col]:
+            dataset[col] = pd.to_numeric(dataset[col], errors='coerce')
+        dataset.loc[temp_fault, self.temp_col] = np.nan
+        dataset.loc[hum_fault, self.humi_col] = np.nan
+        dataset.loc[light_outlier, self.light_col] = np.nan
+
+        flags = pd.DataFrame({
+            self.temp_col: temp_fault,
+            self.humi_col: hum_fault,
+            self.light_col: light_outlier,
+        }, index=df.index)
+        return dataset, flags
+
+    # 한 행(dict)을 판정해 {열 이름: 이상치 여부} 반환
+    def update_row(self, row):
+        temp = np.array([row.get(self.temp_col, np.nan)], dtype=float)
+        hum = np.array([row.get(self.humi_col, np.nan)], dtype=float)
+        light = np.array([row.get(self.light_col, np.nan)], dtype=float)
+        if row.get(self.time_col) is not None:
+            stamp = pd.to_datetime(row[self.time_col], format='mixed', errors='coerce')
+            hours = np.array([np.nan if pd.isna(stamp) else stamp.hour], dtype=float)
+        else:
+            hours = None
+        temp_fault, hum_fault, light_outlier = self._classify(hours, temp, hum, light)
+        return {
+            self.temp_col: bool(temp_fault[0]),
+            self.humi_col: bool(hum_fault[0]),
+            self.light_col: bool(light_outlier[0]),
+        }
+
+    # ---------- 체크포인트 ----------
+    def state_dict(self):
+        return {
+            'temp_col': self.temp_col,
+            'humi_col': self.humi_col,
+            'light_col': self.light_col,
+            'time_col': self.time_col,
+            'z_thresh': self.z_thresh,
+            'min_count': self.min_count,
+            'temp_stats': self.temp_stats.to_dict(),
+            'hum_stats': self.hum_stats.to_dict(),
+            'last_temp': None if np.isnan(self.last_temp) else float(self.last_temp),
+            'last_hum': None if np.isnan(self.last_hum) else float(self.last_hum),
+            'light_sum': self.light_sum.tolist(),
+            'light_cnt': self.light_cnt.tolist(),
+            'rows_seen': self.rows_seen,
+        }
+
+    def save(self, path):
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state_dict(), f)
+        # 중간에 죽어도 이전 체크포인트가 깨지지 않도록 교체 방식으로 저장
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_state(json.load(f))
+
+    @classmethod
+    def from_state(cls, state):
+        det = cls(state['temp_col'], state['humi_col'], state['light_col'],
+                  state['time_col'], state['z_thresh'], state['min_count'])
+        det.temp_stats = RunningStats(**state['temp_stats'])
+        det.hum_stats = RunningStats(**state['hum_stats'])
+        det.last_temp = np.nan if state['last_temp'] is None else state['last_temp']
+        det.last_hum = np.nan if state['last_hum'] is None else state['last_hum']
+        det.light_sum = np.array(state['light_sum'], dtype=float)
+        det.light_cnt = np.array(state['light_cnt'], dtype=float)
+        det.rows_seen = state['rows_seen']
+        return det
+
+
+# (아래는 모듈 실행용 샘플, 실제 서비스에서는 사용 안함)
+if __name__ == "__main__":
+    df = pd.read_csv("data/priva.csv")
+    det = StreamingOutlierDetector().warm_start(df.iloc[:-60])
+    for _, row in df.iloc[-60:].iterrows():
+        print(row['date_time'], det.update_row(row.to_dict()))
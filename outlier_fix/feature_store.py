@@ -0,0 +1,306 @@
+# outlier_fix/feature_store.py
+# 센서 CSV 를 한 번 파싱해 학습/예측용 특징을 바이너리(np.memmap)로 저장하는 저장소
+#   timestamps.bin : int64 (ns)
+#   features.bin   : float64 (행 x FEATURE_COLUMNS)
+#   extras.bin     : float64 (행 x EXTRA_COLUMNS) 보조 센서 (co2, dew_point, vpd), 없는 열은 NaN
+#   derived_<키>.bin : float64 (행 x 파생 특징) features.feature_matrix 결과 캐시, 특징 목록별로 따로
+#   meta.json      : 원본 파일 위치(inode, 읽은 byte 위치, 읽은 부분의 지문), 행 수, 열 위치 설정, 시각 정렬 여부
+# timestamps.bin 이 시간순이면 그 자체가 시각 인덱스 (이진 탐색으로 기간 → 행 범위)
+# 원본 CSV 에 행이 추가되면 새로 붙은 부분만 읽어 뒤에 이어 붙임
+# 쓰기(update, derived_features)는 저장소 폴더의 store.lock 으로 프로세스 사이에서 한 번에 하나만
+import hashlib
+import io
+import json
+import os
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from outlier_fix.features import EXTRA_COLUMNS, CONTEXT_ROWS, feature_matrix, time_features
+from utils import file_lock
+
+STORE_DIR = 'data/feature_store'
+TARGETS = ['Temperature', 'Humidity', 'Solar_Radiation']
+FEATURE_COLUMNS = TARGETS + ['hour', 'minute', 'temp_lag_1', 'humi_lag_1', 'solar_lag_1']
+TIMESTAMP_FILE = 'timestamps.bin'
+FEATURE_FILE = 'features.bin'
+EXTRA_FILE = 'extras.bin'
+DERIVED_FILE = 'derived_{}.bin'
+DERIVED_SLOTS = 4        # 파생 특징 캐시를 몇 가지 특징 목록까지 남길지 (전체/증분/튜닝이 서로 지우지 않도록)
+DERIVED_CHUNK = 100000   # 파생 특징 계산 단위 (행), 창 계산 메모리 제한용
+META_FILE = 'meta.json'
+FINGERPRINT_BYTES = 4096   # 이미 읽은 부분의 지문: 헤더 + 읽은 위치 직전 이 byte 수
+STORE_LOCK_FILE = 'store.lock'
+
+
+class FeatureStore:
+    def __init__(self, path):
+        self.path = path
+        self.meta = self._load_meta()
+
+    # 원본 파일 이름별 기본 저장 위치
+    @classmethod
+    def for_source(cls, source, store_dir=STORE_DIR):
+        name = os.path.splitext(os.path.basename(source))[0]
+        return cls(os.path.join(store_dir, name))
+
+    def _load_meta(self):
+        path = os.path.join(self.path, META_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return None
+
+    def _save_meta(self):
+        path = os.path.join(self.path, META_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(path + '.tmp', path)
+
+    # 같은 저장소 폴더를 쓰는 다른 프로세스(Streamlit, 작업 워커, 야간 학습)와 겹치지 않게 잡는 잠금
+    # 기다리는 동안 다른 프로세스가 meta 를 바꿨을 수 있으므로 잡은 뒤 다시 읽음
+    @contextmanager
+    def _locked(self):
+        with file_lock(os.path.join(os.path.dirname(self.path) or '.', STORE_LOCK_FILE)):
+            self.meta = self._load_meta()
+            yield
+
+    @property
+    def rows(self):
+        return self.meta['rows'] if self.meta else 0
+
+    def _reset(self, source, st, locations, header):
+        os.makedirs(self.path, exist_ok=True)
+        for name in [TIMESTAMP_FILE, FEATURE_FILE, EXTRA_FILE]:
+            open(os.path.join(self.path, name), 'wb').close()
+        for name in os.listdir(self.path):
+            if name.startswith('derived'):
+                os.remove(os.path.join(self.path, name))
+        self.meta = {
+            'source': os.path.abspath(source),
+            'inode': st.st_ino,
+            'offset': len(header),
+            'fingerprint': _fingerprint(source, header, len(header)),
+            'rows': 0,
+            'sorted': True,
+            'locations': locations,
+            'columns': FEATURE_COLUMNS,
+            'extras': EXTRA_COLUMNS,
+        }
+
+    # 원본 CSV 의 새 행을 반영. 파일이 바뀌었거나(inode/크기 감소/읽은 부분의 지문이 다름) 열 위치 설정이 바뀌면
+    # 처음부터 다시 만듦 (to_csv 로 같은 자리에 다시 쓰면 inode 가 그대로라 지문으로 확인)
+    # 반환: 새로 추가된 행 수
+    def update(self, source, settings=None):
+        with self._locked():
+            return self._update(source, settings)
+
+    def _update(self, source, settings=None):
+        if settings is None:
+            from outlier_fix.predict import load_settings
+            settings = load_settings()
+        locations = {
+            'Temperature': settings.get('t_location', 1),
+            'Humidity': settings.get('h_location', 3),
+            'Solar_Radiation': settings.get('r_location', 4),
+        }
+        st = os.stat(source)
+        with open(source, 'rb') as f:
+            header = f.readline()
+
+        meta = self.meta
+        if (meta is None or meta['source'] != os.path.abspath(source) or meta['inode'] != st.st_ino
+                or st.st_size < meta['offset'] or meta['locations'] != locations
+                or meta['columns'] != FEATURE_COLUMNS or meta.get('extras') != EXTRA_COLUMNS
+                or 'sorted' not in meta
+                or meta.get('fingerprint') != _fingerprint(source, header, meta['offset'])):
+            self._reset(source, st, locations, header)
+        if st.st_size == self.meta['offset']:
+            return 0
+
+        with open(source, 'rb') as f:
+            f.seek(self.meta['offset'])
+            data = f.read(st.st_size - self.meta['offset'])
+        # 아직 줄바꿈이 안 된 마지막 줄은 다음 번에
+        cut = data.rfind(b'\n') + 1
+        if cut == 0:
+            return 0
+        stamps, features, extras = self._parse(header, data[:cut], locations)
+        self.meta['sorted'] = self._still_sorted(stamps)
+        self._append(stamps, features, extras)
+        self.meta['offset'] += cut
+        self.meta['fingerprint'] = _fingerprint(source, header, self.meta['offset'])
+        self.meta['rows'] += len(stamps)
+        self._save_meta()
+        return len(stamps)
+
+    def _parse(self, header, data, locations):
+        names = pd.read_csv(io.BytesIO(header), encoding='utf-8-sig', nrows=0).columns
+        lower = {str(col).lower(): i for i, col in enumerate(names)}
+        extra_locs = [lower[name] for name in EXTRA_COLUMNS if name in lower]
+        raw = pd.read_csv(io.BytesIO(header + data), header=0, encoding='utf-8-sig',
+                          usecols=sorted({0, *locations.values(), *extra_locs}))
+        times = pd.to_datetime(raw[names[0]], format='mixed', errors='coerce')
+        values = np.column_stack([pd.to_numeric(raw[names[locations[t]]], errors='coerce')
+                                  for t in TARGETS]).astype(float)
+
+        # lag 는 저장소의 마지막 행에서 이어받음
+        prev = self.tail_values(1)
+        prev = prev[0] if len(prev) else np.full(len(TARGETS), np.nan)
+        lags = np.vstack([prev, values[:-1]])
+        features = np.column_stack([
+            values,
+            times.dt.hour.to_numpy(dtype=float, na_value=np.nan),
+            times.dt.minute.to_numpy(dtype=float, na_value=np.nan),
+            lags,
+        ])
+        extras = np.column_stack([
+            pd.to_numeric(raw[names[lower[name]]], errors='coerce').to_numpy(dtype=float)
+            if name in lower else np.full(len(raw), np.nan)
+            for name in EXTRA_COLUMNS
+        ])
+        stamps = times.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        return stamps, features, extras
+
+    # 새 묶음을 붙여도 시각이 오름차순인지 (NaT 가 섞이면 정렬 안 된 것으로 봄)
+    def _still_sorted(self, stamps):
+        if not self.meta.get('sorted', False):
+            return False
+        if not len(stamps):
+            return True
+        prev = self.timestamps()[-1:] if self.rows else np.empty(0, dtype=np.int64)
+        stamps = np.concatenate([prev, stamps])
+        return bool(stamps.min() != np.iinfo(np.int64).min and (np.diff(stamps) >= 0).all())
+
+    def _append(self, stamps, features, extras):
+        # 이전에 쓰다 중단된 꼬리는 잘라내고 이어 씀
+        for name, array, width in [(TIMESTAMP_FILE, stamps, 1), (FEATURE_FILE, features, len(FEATURE_COLUMNS)),
+                                   (EXTRA_FILE, extras, len(EXTRA_COLUMNS))]:
+            path = os.path.join(self.path, name)
+            with open(path, 'r+b') as f:
+                f.truncate(self.rows * width * 8)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(array).tobytes())
+
+    def _memmap(self, name, width):
+        if not self.rows:
+            return np.empty((0, width) if width > 1 else 0)
+        shape = (self.rows, width) if width > 1 else (self.rows,)
+        dtype = np.int64 if name == TIMESTAMP_FILE else np.float64
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode='r', shape=shape)
+
+    def timestamps(self):
+        return self._memmap(TIMESTAMP_FILE, 1)
+
+    def features(self):
+        return self._memmap(FEATURE_FILE, len(FEATURE_COLUMNS))
+
+    def extras(self):
+        return self._memmap(EXTRA_FILE, len(EXTRA_COLUMNS))
+
+    def tail_values(self, n):
+        return np.array(self.features()[-n:, :len(TARGETS)]) if self.rows else np.empty((0, len(TARGETS)))
+
+    # since/tail 조건에 맞는 첫 행 위치
+    #   since : 이 시각 이후의 행만 (timestamps 가 정렬돼 있으면 이진 탐색)
+    #   tail  : 마지막 n 행만
+    def window_start(self, since=None, tail=None):
+        start = 0
+        if since is not None:
+            start = self._after(self.timestamps(), pd.Timestamp(since).value)
+        if tail:
+            start = max(start, self.rows - tail)
+        return start
+
+    # since 보다 뒤인 첫 행. 정렬돼 있으면 이진 탐색, 아니면 전체 비교 (NaT 행은 건너뜀)
+    def _after(self, stamps, since):
+        if self.meta and self.meta.get('sorted', False):
+            return int(np.searchsorted(stamps, since, side='right'))
+        later = np.flatnonzero(np.asarray(stamps) > since)
+        return int(later[0]) if len(later) else self.rows
+
+    # 마지막 시각 기준 최근 days 일 구간의 첫 행 위치 (없으면 0)
+    def last_days_start(self, days):
+        stamps = self.timestamps()
+        if not self.rows or days is None:
+            return 0
+        valid = np.asarray(stamps[-1:]) if self.meta.get('sorted', False) else \
+            np.asarray(stamps)[np.asarray(stamps) != np.iinfo(np.int64).min]
+        if not len(valid):
+            return 0
+        last = int(valid.max())
+        return self._after(stamps, last - pd.Timedelta(days=days).value)
+
+    # features.feature_matrix 로 만든 파생 특징 ((행 - start) x names) memmap
+    # 이름 목록마다 따로 디스크에 캐시해 두고 (최근에 쓴 DERIVED_SLOTS 개까지), 지난번 이후 추가된 행만 계산해 이어 붙임
+    # start 이전 행은 계산하지 않음 (캐시가 start 보다 앞에서 시작하면 그대로 잘라서 씀)
+    def derived_features(self, names, start=0):
+        with self._locked():
+            return self._derived_features(names, start)
+
+    def _derived_features(self, names, start=0):
+        names = list(names)
+        key = hashlib.sha1(','.join(names).encode('utf-8')).hexdigest()[:12]
+        path = os.path.join(self.path, DERIVED_FILE.format(key))
+        slots = self.meta.setdefault('derived_slots', {})
+        cached = slots.pop(key, None)
+        if cached and cached['names'] == names and cached['start'] <= start and os.path.exists(path):
+            base, done = cached['start'], cached['rows']
+        else:
+            base, done = start, start
+            open(path, 'wb').close()
+        # 최근에 쓴 목록이 맨 뒤로, 넘치면 가장 오래 안 쓴 캐시부터 지움
+        slots[key] = {'names': names, 'start': base, 'rows': done}
+        while len(slots) > DERIVED_SLOTS:
+            old = next(iter(slots))
+            del slots[old]
+            if os.path.exists(os.path.join(self.path, DERIVED_FILE.format(old))):
+                os.remove(os.path.join(self.path, DERIVED_FILE.format(old)))
+        self._save_meta()
+        if done < self.rows:
+            with open(path, 'r+b') as f:
+                f.truncate((done - base) * len(names) * 8)
+                f.seek(0, os.SEEK_END)
+                for begin in range(done, self.rows, DERIVED_CHUNK):
+                    end = min(begin + DERIVED_CHUNK, self.rows)
+                    lo = max(begin - CONTEXT_ROWS, 0)
+                    values = np.array(self.features()[lo:end, :len(TARGETS)])
+                    times = time_features(np.array(self.timestamps()[lo:end]).astype('datetime64[ns]'))
+                    extras = np.array(self.extras()[lo:end])
+                    block = feature_matrix(values, times, np.arange(begin - lo, end - lo), names, extras)
+                    f.write(np.ascontiguousarray(block).tobytes())
+            slots[key]['rows'] = self.rows
+            self._save_meta()
+        if self.rows <= base:
+            return np.empty((0, len(names)))
+        return np.memmap(path, dtype=np.float64, mode='r', shape=(self.rows - base, len(names)))[start - base:]
+
+    # 특징 DataFrame (Timestamp + FEATURE_COLUMNS + EXTRA_COLUMNS), since/tail 은 window_start 참고
+    # 필요한 구간만 memmap 에서 복사하므로 전체 파일을 읽지 않음
+    def frame(self, since=None, tail=None):
+        stamps = self.timestamps()
+        start = self.window_start(since, tail)
+        df = pd.DataFrame(np.hstack([self.features()[start:], self.extras()[start:]]),
+                          columns=FEATURE_COLUMNS + EXTRA_COLUMNS)
+        df.insert(0, 'Timestamp', pd.to_datetime(np.array(stamps[start:]), unit='ns'))
+        return df
+
+
+# 헤더 + offset 직전 FINGERPRINT_BYTES byte 의 해시. 이미 읽은 부분이 그대로인지 확인용
+def _fingerprint(source, header, offset):
+    with open(source, 'rb') as f:
+        f.seek(max(offset - FINGERPRINT_BYTES, 0))
+        data = f.read(min(offset, FINGERPRINT_BYTES))
+    return hashlib.sha1(header + data).hexdigest()
+
+
+# 원본 CSV 를 저장소에 반영한 뒤 저장소 객체 반환
+def sync_store(source, settings=None, store_dir=STORE_DIR):
+    store = FeatureStore.for_source(source, store_dir)
+    store.update(source, settings)
+    return store
+
+
+if __name__ == "__main__":
+    import sys
+    store = sync_store(sys.argv[1] if len(sys.argv) > 1 else 'data/mc.csv')
+    print(f"{store.path}: {store.rows}행")
@@ -0,0 +1,169 @@
+# outlier_fix/features.py
+# 보정 모델 입력 특징을 이름으로 계산하는 공용 파이프라인
+# 학습(train_models), 예측(predict, predict_tail, gap_fill) 모두 이 함수로 특징을 만들기 때문에
+# 모델에 저장된 특징 이름(booster.feature_name())만 있으면 같은 값을 다시 만들 수 있음
+#
+# 특징 이름 규칙 (prefix: temp, humi, solar)
+#   Temperature / Humidity / Solar_Radiation : 같은 행의 다른 대상 값
+#   hour, minute, doy                         : 시, 분, 연중 일자
+#   tod_sin, tod_cos, doy_sin, doy_cos        : 하루/일 년 주기 인코딩
+#   {prefix}_lag_{k}                          : k 행 전 값
+#   {prefix}_diff_1                           : lag_1 - lag_2
+#   {prefix}_mean_{w}, {prefix}_std_{w}       : 직전 w 행(현재 행 제외) 평균/표준편차
+#   co2, dew_point, vpd                       : 같은 행의 보조 센서 값 (없으면 NaN)
+import numpy as np
+import pandas as pd
+
+TARGETS = ['Temperature', 'Humidity', 'Solar_Radiation']
+PREFIXES = ['temp', 'humi', 'solar']
+EXTRA_COLUMNS = ['co2', 'dew_point', 'vpd']
+LAGS = (1, 2, 3, 5, 10)
+WINDOWS = (5, 15, 60)
+# 한 행의 특징을 만들 때 필요한 이전 행 수
+CONTEXT_ROWS = max(max(LAGS), max(WINDOWS)) + 1
+# 이 특징들이 결측이면 예측하지 않음 (나머지는 LightGBM 이 결측 그대로 처리)
+REQUIRED = set(TARGETS) | {f'{p}_lag_1' for p in PREFIXES}
+
+MAX_FEATURES = 12          # 중요도 가지치기 후 남길 최대 특징 수
+IMPORTANCE_COVERAGE = 0.99  # 누적 gain 비율이 이 값에 닿을 때까지 남김
+
+
+# 기존 모델이 쓰던 특징 (다른 대상 + hour, minute + lag_1)
+def legacy_feature_names(target):
+    return ([t for t in TARGETS if t != target] + ['hour', 'minute']
+            + [f'{p}_lag_1' for p in PREFIXES])
+
+
+# 대상 하나에 대해 만들 수 있는 모든 특징 이름
+def all_feature_names(target):
+    names = [t for t in TARGETS if t != target]
+    names += ['hour', 'minute', 'doy', 'tod_sin', 'tod_cos', 'doy_sin', 'doy_cos']
+    for p in PREFIXES:
+        names += [f'{p}_lag_{k}' for k in LAGS]
+        names.append(f'{p}_diff_1')
+        for w in WINDOWS:
+            names += [f'{p}_mean_{w}', f'{p}_std_{w}']
+    return names + EXTRA_COLUMNS
+
+
+# 시각 → (행 x 3) [hour, minute, doy]
+def time_features(timestamps):
+    times = pd.to_datetime(pd.Series(timestamps), format='mixed', errors='coerce')
+    return np.column_stack([
+        times.dt.hour.to_numpy(dtype=float, na_value=np.nan),
+        times.dt.minute.to_numpy(dtype=float, na_value=np.nan),
+        times.dt.dayofyear.to_numpy(dtype=float, na_value=np.nan),
+    ])
+
+
+# 원본 DataFrame 에서 보조 센서 열 (행 x EXTRA_COLUMNS), 없는 열은 NaN
+def extra_matrix(df):
+    lower = {str(col).lower(): col for col in df.columns}
+    return np.column_stack([
+        pd.to_numeric(df[lower[name]], errors='coerce').to_numpy(dtype=float)
+        if name in lower else np.full(len(df), np.nan)
+        for name in EXTRA_COLUMNS
+    ])
+
+
+def _shifted(column, rows, k):
+    src = rows - k
+    out = np.full(len(rows), np.nan)
+    ok = src >= 0
+    out[ok] = column[src[ok]]
+    return out
+
+
+def _window(column, rows, w):
+    idx = rows[:, None] - np.arange(1, w + 1)[None, :]
+    return np.where(idx >= 0, column[np.clip(idx, 0, None)], np.nan)
+
+
+# rows 행들의 특징 행렬 (len(rows) x len(names))
+#   values : (행 x 3) 대상 값 (TARGETS 순서)
+#   times  : (행 x 2 또는 3) [hour, minute, (doy)]
+#   extras : (행 x EXTRA_COLUMNS) 또는 None
+# 직전 행들만 참조하므로 rows 앞쪽 CONTEXT_ROWS 행만 있으면 됨. 요청한 특징만 계산
+def feature_matrix(values, times, rows, names, extras=None):
+    values = np.asarray(values, dtype=float)
+    times = np.asarray(times, dtype=float)
+    rows = np.asarray(rows, dtype=np.int64)
+    out = np.empty((len(rows), len(names)))
+    windows = {}
+
+    def window(j, w):
+        if (j, w) not in windows:
+            block = _window(values[:, j], rows, w)
+            valid = ~np.isnan(block)
+            count = valid.sum(axis=1)
+            total = np.where(valid, block, 0.0).sum(axis=1)
+            mean = np.divide(total, count, out=np.full(len(rows), np.nan), where=count > 0)
+            sq = np.where(valid, (block - mean[:, None]) ** 2, 0.0).sum(axis=1)
+            std = np.sqrt(np.divide(sq, count, out=np.full(len(rows), np.nan), where=count > 0))
+            windows[(j, w)] = (mean, std)
+        return windows[(j, w)]
+
+    for c, name in enumerate(names):
+        if name in TARGETS:
+            out[:, c] = values[rows, TARGETS.index(name)]
+        elif name in ('hour', 'minute', 'doy'):
+            col = ('hour', 'minute', 'doy').index(name)
+            out[:, c] = times[rows, col] if col < times.shape[1] else np.nan
+        elif name in ('tod_sin', 'tod_cos'):
+            angle = 2 * np.pi * (times[rows, 0] * 60 + times[rows, 1]) / 1440
+            out[:, c] = np.sin(angle) if name == 'tod_sin' else np.cos(angle)
+        elif name in ('doy_sin', 'doy_cos'):
+            doy = times[rows, 2] if times.shape[1] > 2 else np.full(len(rows), np.nan)
+            angle = 2 * np.pi * doy / 365.25
+            out[:, c] = np.sin(angle) if name == 'doy_sin' else np.cos(angle)
+        elif name in EXTRA_COLUMNS:
+            out[:, c] = extras[rows, EXTRA_COLUMNS.index(name)] if extras is not None else np.nan
+        else:
+            prefix, kind, size = name.split('_')
+            j = PREFIXES.index(prefix)
+            size = int(size)
+            if kind == 'lag':
+                out[:, c] = _shifted(values[:, j], rows, size)
+            elif kind == 'diff':
+                out[:, c] = _shifted(values[:, j], rows, 1) - _shifted(values[:, j], rows, 2)
+            elif kind == 'mean':
+                out[:, c] = window(j, size)[0]
+            elif kind == 'std':
+                out[:, c] = window(j, size)[1]
+            else:
+                raise ValueError(f"알 수 없는 특징: {name}")
+    return out
+
+
+# 예측 가능 여부: REQUIRED 특징이 모두 있는 행
+def required_ok(X, names):
+    cols = [c for c, name in enumerate(names) if name in REQUIRED]
+    return ~np.isnan(X[:, cols]).any(axis=1)
+
+
+def model_features(model):
+    return list(model.booster_.feature_name())
+
+
+# feature_matrix 결과(numpy)로 예측. sklearn 의 특징 이름 검사를 거치지 않도록 부스터로 바로 예측
+# num_threads 를 주면 학습 때의 n_jobs 대신 그 스레드 수로 예측
+def predict(model, X, num_threads=None):
+    kwargs = {} if num_threads is None else {'num_threads': num_threads}
+    return model.booster_.predict(X, num_iteration=model.best_iteration_ or None, **kwargs)
+
+
+# gain 중요도 기준으로 특징 가지치기 (REQUIRED 특징은 항상 남김)
+def prune_features(names, gains, max_features=MAX_FEATURES, coverage=IMPORTANCE_COVERAGE):
+    gains = np.asarray(gains, dtype=float)
+    order = np.argsort(-gains)
+    total = gains.sum()
+    keep = {name for name in names if name in REQUIRED}
+    covered = sum(g for name, g in zip(names, gains) if name in keep)
+    for i in order:
+        if len(keep) >= max_features or (total > 0 and covered / total >= coverage):
+            break
+        if names[i] in keep:
+            continue
+        keep.add(names[i])
+        covered += gains[i]
+    return [name for name in names if name in keep]
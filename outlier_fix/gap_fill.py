@@ -0,0 +1,72 @@
+# outlier_fix/gap_fill.py
+import numpy as np
+from outlier_fix.features import feature_matrix, model_features, predict, required_ok
+
+
+# bool 배열에서 연속 True 구간의 (시작 위치, 길이)
+def find_runs(is_nan):
+    is_nan = np.asarray(is_nan, dtype=bool)
+    if not is_nan.any():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    padded = np.concatenate([[False], is_nan, [False]]).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends - starts
+
+
+# 연속 결측 구간을 앞에서부터 한 칸씩 예측해 채우고, 예측값을 다음 칸의 lag 로 다시 사용
+#   values : (행 x 대상) 대상 센서 값 (온도, 습도, 광 순서), NaN 이 채울 칸
+#   times  : (행 x 3) hour, minute, doy (features.time_features)
+#   models : 대상 순서와 같은 모델 리스트
+#   extras : (행 x features.EXTRA_COLUMNS) 보조 센서 값, 모델이 쓰지 않으면 None 이어도 됨
+# 입력 특징은 모델에 저장된 특징 이름대로 features.feature_matrix 로 만듦
+# (예측한 값이 다음 칸의 lag/이동 평균에 그대로 반영됨)
+# 같은 단계(구간 안 k번째 칸)는 모든 구간을 한 번에 예측하므로
+# 모델 호출 수는 결측 칸 수가 아니라 (가장 긴 구간 길이 x 대상 수) 이하
+# min_gap/max_gap 을 주면 그 길이 범위의 구간만 채움, max_steps 를 주면 구간 앞쪽 그 칸 수까지만
+# progress : progress(완료 수, 전체 수, 대상 위치) 콜백. 단계마다 대상 하나를 예측할 때마다 호출 (예외를 내면 중단)
+def fill_gaps_autoregressive(values, times, models, max_gap=None, min_gap=None, extras=None, max_steps=None,
+                             progress=None):
+    values = np.array(values, dtype=float)
+    times = np.asarray(times, dtype=float)
+    n_targets = values.shape[1]
+    filled = np.zeros(n_targets, dtype=np.int64)
+    model_calls = 0
+
+    runs = []
+    for j in range(n_targets):
+        starts, lengths = find_runs(np.isnan(values[:, j]))
+        # 첫 행부터 결측이면 lag 가 없어서 채울 수 없음
+        keep = starts > 0
+        starts, lengths = starts[keep], lengths[keep]
+        if max_gap is not None:
+            keep = lengths <= max_gap
+            starts, lengths = starts[keep], lengths[keep]
+        if min_gap is not None:
+            keep = lengths >= min_gap
+            starts, lengths = starts[keep], lengths[keep]
+        runs.append((starts, lengths))
+
+    longest = max((lengths.max() for _, lengths in runs if len(lengths)), default=0)
+    if max_steps is not None:
+        longest = min(longest, max_steps)
+    names = [model_features(model) for model in models]
+    for k in range(longest):
+        for j in range(n_targets):
+            starts, lengths = runs[j]
+            rows = starts[lengths > k] + k
+            if rows.size == 0:
+                continue
+            X = feature_matrix(values, times, rows, names[j], extras)
+            # 이전 칸을 못 채웠거나 다른 입력값이 결측이면 건너뜀 (구간의 나머지도 lag 가 없어 멈춤)
+            ok = required_ok(X, names[j]) & np.isnan(values[rows, j])
+            if not ok.any():
+                continue
+            values[rows[ok], j] = predict(models[j], X[ok])
+            filled[j] += ok.sum()
+            model_calls += 1
+            if progress is not None:
+                progress(k * n_targets + j + 1, longest * n_targets, j)
+
+    return values, filled, model_calls
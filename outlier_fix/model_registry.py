@@ -0,0 +1,71 @@
+# outlier_fix/model_registry.py
+import os
+import threading
+from collections import OrderedDict
+import joblib
+
+MODEL_DIR = 'outlier_fix/trained_models'
+MEMORY_BUDGET_MB = 256
+
+# 프로세스 전체에서 공유하는 모델 캐시
+#   경로 -> (파일 키(mtime, 크기), 모델, 크기 byte). 오래 안 쓴 것부터 뒤로 밀림(LRU)
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'loads': 0, 'reloads': 0, 'evictions': 0}
+
+
+def model_path(target, model_dir=MODEL_DIR):
+    return os.path.join(model_dir, f'model_{target}.pkl')
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _evict(budget_bytes):
+    total = sum(size for _, _, size in _cache.values())
+    # 방금 쓴 모델(맨 뒤)은 예산을 넘어도 남겨 둠
+    while total > budget_bytes and len(_cache) > 1:
+        _, (_, _, size) = _cache.popitem(last=False)
+        total -= size
+        _stats['evictions'] += 1
+
+
+# 대상 모델을 한 번만 불러오고 이후에는 캐시에서 반환
+# 야간 학습(train_model)이 파일을 다시 쓰면 mtime/크기가 바뀌므로 자동으로 다시 불러옴
+# 파일이 없으면 FileNotFoundError 를 그대로 올림
+def get_model(target, model_dir=MODEL_DIR, budget_mb=MEMORY_BUDGET_MB):
+    path = model_path(target, model_dir)
+    key = _file_key(path)
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == key:
+            _cache.move_to_end(path)
+            _stats['hits'] += 1
+            return cached[1]
+
+        model = joblib.load(path)
+        _stats['reloads' if cached is not None else 'loads'] += 1
+        _cache[path] = (key, model, key[1])
+        _cache.move_to_end(path)
+        _evict(budget_mb * 1024 * 1024)
+        return model
+
+
+def get_models(targets, model_dir=MODEL_DIR):
+    return {target: get_model(target, model_dir) for target in targets}
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+def cache_info():
+    with _lock:
+        return {
+            **_stats,
+            'cached': [os.path.basename(path) for path in _cache],
+            'size_mb': sum(size for _, _, size in _cache.values()) / (1024 * 1024),
+        }
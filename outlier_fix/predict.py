@@ -1,7 +1,9 @@
 # outlier_fix/predict.py
 import pandas as pd
-import joblib
-import openpyxl
+from outlier_fix.model_registry import get_model, model_path
+from outlier_fix.feature_store import sync_store
+from outlier_fix.features import (CONTEXT_ROWS, EXTRA_COLUMNS, TARGETS, feature_matrix, model_features,
+                                  predict, time_features)
 import json
 import os
 
@@ -19,46 +21,39 @@ def load_settings():
             "t_location": 1,
         }
 
-def correct_outlier(input_path, output_path, settings=None):
+# 입력 CSV 를 output_path 로 복사하면서 마지막 행의 {열 위치: 값} 을 바꿔 씀 (.xlsx 면 엑셀, 아니면 CSV)
+def write_output(input_path, output_path, updates=None):
+    df = pd.read_csv(input_path)
+    for col, value in (updates or {}).items():
+        df.iloc[-1, col] = value
+    if output_path.endswith('.xlsx'):
+        df.to_excel(output_path, index=False)
+    else:
+        df.to_csv(output_path, index=False, encoding='utf-8-sig')
+
+# incremental=True 면 파일 끝 몇 줄만 읽어 마지막 행을 CSV 에서 바로 고침 (predict_tail 참고)
+#   줄 단위로 덧붙이거나 고쳐 쓰므로 output_path 는 CSV 여야 함 (엑셀 등은 ValueError)
+def correct_outlier(input_path, output_path, settings=None, incremental=False):
     if settings is None:
         settings = load_settings()
 
+    if incremental:
+        if output_path and not output_path.lower().endswith('.csv'):
+            raise ValueError(f"증분 보정은 CSV 출력만 지원합니다: {output_path}")
+        from outlier_fix.predict_tail import correct_outlier_tail
+        return correct_outlier_tail(input_path, output_path, settings)
+
     h_location = settings.get('h_location', 3)
     r_location = settings.get('r_location', 4)
     t_location = settings.get('t_location', 1)
 
+    # 특징 계산에 필요한 마지막 CONTEXT_ROWS 행만 feature_store 에서 꺼냄 (새 행만 파싱해서 반영)
     try:
-        df = pd.read_csv(input_path)
-        df.to_excel(output_path, index=False)
-    except Exception as e:
-        print(f"파일 변환 실패: {e}")
-        return f"파일 변환 실패: {e}"
-
-    array = [name for _, name in sorted([
-        (h_location, 'Humidity'),
-        (t_location, 'Temperature'),
-        (r_location, 'Solar_Radiation')
-    ])]
-
-    use_cols = [0, h_location, r_location, t_location]
-
-    try:
-        df = pd.read_excel(output_path, header=0, usecols=use_cols)
-        df.columns = ['Timestamp'] + array
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-        df['Temperature'] = pd.to_numeric(df['Temperature'], errors='coerce')
-        df['Humidity'] = pd.to_numeric(df['Humidity'], errors='coerce')
-        df['Solar_Radiation'] = pd.to_numeric(df['Solar_Radiation'], errors='coerce')
+        df = sync_store(input_path, settings).frame(tail=CONTEXT_ROWS)
     except FileNotFoundError:
-        return f"오류: {output_path} 파일을 찾을 수 없습니다."
+        return f"오류: {input_path} 파일을 찾을 수 없습니다."
     except Exception as e:
-        return f"엑셀 파일 로드 오류: {e}"
-
-    df['hour'] = df['Timestamp'].dt.hour
-    df['minute'] = df['Timestamp'].dt.minute
-    df['temp_lag_1'] = df['Temperature'].shift(1)
-    df['humi_lag_1'] = df['Humidity'].shift(1)
-    df['solar_lag_1'] = df['Solar_Radiation'].shift(1)
+        return f"파일 로드 오류: {e}"
 
     target_to_predict = None
     last_row_index = df.index[-1]
@@ -72,30 +67,22 @@ def correct_outlier(input_path, output_path, settings=None):
         target_to_predict = 'Solar_Radiation'
 
     if target_to_predict:
-        predict_df = last_row
         try:
-            model_filename = f'outlier_fix/trained_models/model_{target_to_predict}.pkl'
-            model = joblib.load(model_filename)
+            model_filename = model_path(target_to_predict)
+            model = get_model(target_to_predict)
 
-            all_analysis_cols = ['Temperature', 'Humidity', 'Solar_Radiation',
-                                'hour', 'minute', 'temp_lag_1', 'humi_lag_1',
-                                'solar_lag_1']
-            features = [col for col in all_analysis_cols if col != target_to_predict]
-            X_predict = predict_df[features]
-            predicted_value = model.predict(X_predict)
+            # 모델에 저장된 특징 이름대로 마지막 행의 입력을 만듦
+            X_predict = feature_matrix(
+                df[TARGETS].to_numpy(), time_features(df['Timestamp']), [len(df) - 1],
+                model_features(model), df[EXTRA_COLUMNS].to_numpy())
+            predicted_value = predict(model, X_predict)
 
             col_map = {
-                'Humidity': h_location + 1,
-                'Solar_Radiation': r_location + 1,
-                'Temperature': t_location + 1,
+                'Humidity': h_location,
+                'Solar_Radiation': r_location,
+                'Temperature': t_location,
             }
-            excel_col = col_map.get(target_to_predict)
-            excel_row = last_row_index + 2
-
-            wb = openpyxl.load_workbook(output_path)
-            ws = wb.active
-            ws.cell(row=excel_row, column=excel_col).value = predicted_value[0]
-            wb.save(output_path)
+            write_output(input_path, output_path, {col_map[target_to_predict]: predicted_value[0]})
             msg = f"{df.at[last_row_index, 'Timestamp']} 행, {target_to_predict} 열에 {predicted_value[0]:.2f} 저장"
             print(msg)
             return msg
@@ -105,6 +92,7 @@ def correct_outlier(input_path, output_path, settings=None):
         except Exception as e:
             return f"예측 중 오류 발생: {e}"
     else:
+        write_output(input_path, output_path)
         return "보정할 이상치가 없습니다."
 
 if __name__ == "__main__":
@@ -1,9 +1,13 @@
 # outlier_fix/predict_full.py
-import pandas as pd
-import joblib
 import numpy as np
+import pandas as pd
+from outlier_fix.model_registry import get_model
+from outlier_fix.gap_fill import fill_gaps_autoregressive
+from outlier_fix.features import time_features, extra_matrix
 
-def correct_outlier_df(df, temp_index, humi_index, light_index):
+# fill_runs: 연속 결측 구간도 예측값을 다음 lag 로 이어가며 채움 (False 면 직전 행이 있는 칸만)
+# progress : progress(완료 수, 전체 수, 열 이름) 콜백. 대상 열을 예측할 때마다 호출 (예외를 내면 중단)
+def correct_outlier_df(df, temp_index, humi_index, light_index, fill_runs=True, progress=None):
     cols = df.columns.tolist()
     temp_col = cols[temp_index]
     humi_col = cols[humi_index]
@@ -24,41 +28,36 @@ def correct_outlier_df(df, temp_index, humi_index, light_index):
     df_copy[f'{humi_col}_lag_1'] = df_copy[humi_col].shift(1)
     df_copy[f'{light_col}_lag_1'] = df_copy[light_col].shift(1)
 
-    # 2. 모델 로드 (파일명은 관례에 따라 조절)
+    # 2. 모델 로드 (프로세스 캐시, 재학습으로 파일이 바뀌면 다시 불러옴)
     try:
         models = {
-            temp_col: joblib.load(f'outlier_fix/trained_models/model_Temperature.pkl'),
-            humi_col: joblib.load(f'outlier_fix/trained_models/model_Humidity.pkl'),
-            light_col: joblib.load(f'outlier_fix/trained_models/model_Solar_Radiation.pkl')
+            temp_col: get_model('Temperature'),
+            humi_col: get_model('Humidity'),
+            light_col: get_model('Solar_Radiation')
         }
     except Exception as e:
         return df_copy, f"모델 로드 실패: {e}"
 
-    analysis_cols = [temp_col, humi_col, light_col,
-                     'hour', 'minute',
-                     f'{temp_col}_lag_1', f'{humi_col}_lag_1', f'{light_col}_lag_1']
-
     target_list = [temp_col, humi_col, light_col]
     changes_made = False
 
-    df_pred = df_copy.dropna(subset=[f'{temp_col}_lag_1', f'{humi_col}_lag_1', f'{light_col}_lag_1'])
-
-    for target in target_list:
-        nan_rows = df_pred[df_pred[target].isnull()]
-        if nan_rows.empty:
-            continue
-        model = models.get(target)
-        features = [col for col in analysis_cols if col != target]
-        for idx, row in nan_rows.iterrows():
-            if row[features].isnull().any():
-                continue  # 입력값 결측 존재시 예측 안함
-            try:
-                X_pred = np.array(row[features]).reshape(1, -1)
-                pred_value = model.predict(X_pred)
-                df_copy.at[idx, target] = pred_value[0]
-                changes_made = True
-            except Exception as e:
-                print(f"예측 실패: {idx}-{target}, {e}")
+    # 3. 예측: 모델에 저장된 특징(lag, 이동 평균 등)을 features.feature_matrix 로 만들어 결측 칸 채움
+    values = df_copy[target_list].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    if time_col in df_copy.columns:
+        times = time_features(df_copy[time_col])
+    else:
+        times = np.zeros((len(df_copy), 3))
+    try:
+        filled_values, filled, _ = fill_gaps_autoregressive(
+            values, times, [models[target] for target in target_list],
+            extras=extra_matrix(df_copy), max_steps=None if fill_runs else 1,
+            progress=None if progress is None else lambda done, total, j: progress(done, total, target_list[j]))
+    except Exception as e:
+        return df_copy, f"예측 실패: {e}"
+    for j, target in enumerate(target_list):
+        if filled[j]:
+            df_copy[target] = filled_values[:, j]
+            changes_made = True
 
     msg = "모든 결측치 보정 완료" if changes_made else "수정할 결측치 없음"
     return df_copy, msg
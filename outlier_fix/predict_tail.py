@@ -0,0 +1,159 @@
+# outlier_fix/predict_tail.py
+import codecs
+import csv
+import io
+import os
+import numpy as np
+import pandas as pd
+from outlier_fix.model_registry import get_model
+from outlier_fix.features import (CONTEXT_ROWS, TARGETS, extra_matrix, feature_matrix, model_features,
+                                  predict, time_features)
+from precleaning.incoding import TRY_ENCODINGS, guess_encoding
+
+TAIL_ROWS = CONTEXT_ROWS   # lag/이동 평균 특징에 필요한 만큼만 읽음
+BLOCK_SIZE = 8192
+
+
+def read_header_line(path):
+    with open(path, 'rb') as f:
+        return f.readline()
+
+
+# 헤더 + 끝부분 byte 를 오류 없이 읽을 수 있는 인코딩 (read_csv_robust 와 같은 후보 순서)
+# 줄 단위로 다시 인코딩하므로 utf-8-sig 는 utf-8 로 돌려줌 (BOM 은 헤더에서만 떼어냄)
+def detect_encoding(path, sample):
+    guess = guess_encoding(path)
+    for enc in dict.fromkeys(([guess] if guess else []) + TRY_ENCODINGS):
+        try:
+            sample.decode(enc)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        return 'utf-8' if codecs.lookup(enc).name == 'utf-8-sig' else enc
+    return 'utf-8'
+
+
+# 파일 끝에서부터 블록 단위로 거꾸로 읽어 마지막 n_lines 줄(byte)과 마지막 줄 시작 위치 반환
+# 헤더 줄은 결과에 포함하지 않음. 파일 크기와 상관없이 읽는 양이 일정함
+def read_tail_lines(path, n_lines, block_size=BLOCK_SIZE):
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        pos = end
+        data = b''
+        # 줄 수 + 1(잘린 앞 줄) 만큼 개행이 모일 때까지
+        while pos > 0 and data.count(b'\n') <= n_lines + 1:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+
+    all_lines = data.splitlines(keepends=True)
+    # 끝의 빈 줄은 무시
+    tail_end = end
+    while all_lines and not all_lines[-1].strip():
+        tail_end -= len(all_lines.pop())
+    # 맨 앞은 중간에서 잘린 줄이거나(pos > 0) 헤더(pos == 0)
+    lines = all_lines[1:][-n_lines:]
+    last_offset = tail_end - len(lines[-1]) if lines else tail_end
+    return lines, last_offset
+
+
+# 반환: (Timestamp + TARGETS DataFrame, 보조 센서 행렬)
+def _parse_tail(header, lines, encoding, h_location, r_location, t_location):
+    text = header + ''.join(line.decode(encoding) for line in lines)
+    raw = pd.read_csv(io.StringIO(text), header=0, dtype=str, keep_default_na=False)
+    df = pd.DataFrame({'Timestamp': pd.to_datetime(raw.iloc[:, 0], format='mixed', errors='coerce')})
+    for col, loc in [('Temperature', t_location), ('Humidity', h_location), ('Solar_Radiation', r_location)]:
+        df[col] = pd.to_numeric(raw.iloc[:, loc], errors='coerce')
+    return df, extra_matrix(raw)
+
+
+def _replace_fields(line, updates, encoding):
+    text = line.decode(encoding)
+    ending = '\r\n' if text.endswith('\r\n') else '\n' if text.endswith('\n') else ''
+    fields = next(csv.reader([text.rstrip('\r\n')]))
+    for col, value in updates.items():
+        fields[col] = f"{value:.2f}"
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator=ending).writerow(fields)
+    return buf.getvalue()
+
+
+# 마지막 줄을 new_line 으로 교체 (그 앞부분은 건드리지 않음)
+def _patch_last_line(path, offset, new_line):
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.truncate()
+        f.write(new_line)
+
+
+# 출력 CSV 에 보정된 행을 추가. 마지막 행이 같은 시각이면 그 줄만 교체
+# 출력 파일은 입력 인코딩과 상관없이 항상 utf-8-sig 로 씀
+def _append_or_patch(output_path, header, new_line):
+    new_line = new_line.encode('utf-8')
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        with open(output_path, 'wb') as f:
+            f.write(('\ufeff' + header).encode('utf-8'))
+            f.write(new_line)
+        return 'append'
+
+    lines, offset = read_tail_lines(output_path, 1)
+    new_key = new_line.split(b',', 1)[0]
+    if lines and lines[-1].split(b',', 1)[0] == new_key:
+        _patch_last_line(output_path, offset, new_line)
+        return 'patch'
+    with open(output_path, 'ab') as f:
+        f.write(new_line)
+    return 'append'
+
+
+# predict.correct_outlier 의 증분 버전: 파일 끝 몇 줄만 읽어 마지막 행을 보정
+#   output_path 가 없으면 입력 파일의 마지막 줄을 그 자리에서 고침
+#   있으면 출력 CSV 에 보정된 행을 추가(같은 시각이면 교체)
+# 파일이 커져도 읽기/쓰기 양이 일정해서 지연 시간이 늘지 않음
+def correct_outlier_tail(input_path, output_path=None, settings=None, n_rows=TAIL_ROWS):
+    if settings is None:
+        from outlier_fix.predict import load_settings
+        settings = load_settings()
+    h_location = settings.get('h_location', 3)
+    r_location = settings.get('r_location', 4)
+    t_location = settings.get('t_location', 1)
+    col_map = {'Humidity': h_location, 'Solar_Radiation': r_location, 'Temperature': t_location}
+
+    try:
+        header_bytes = read_header_line(input_path)
+        lines, last_offset = read_tail_lines(input_path, max(n_rows, 2))
+        encoding = detect_encoding(input_path, header_bytes + b''.join(lines))
+        header = header_bytes.decode(encoding).lstrip('\ufeff')
+        df, extras = _parse_tail(header, lines, encoding, h_location, r_location, t_location)
+    except FileNotFoundError:
+        return f"오류: {input_path} 파일을 찾을 수 없습니다."
+    except Exception as e:
+        return f"파일 로드 오류: {e}"
+    if df.empty:
+        return "보정할 이상치가 없습니다."
+
+    values = df[TARGETS].to_numpy(dtype=float)
+    times = time_features(df['Timestamp'])
+    last = len(df) - 1
+    # correct_outlier 와 같이 Temperature → Humidity → Solar_Radiation 순서로 첫 결측 열 하나만 보정
+    missing = [j for j in range(len(TARGETS)) if np.isnan(values[last, j])]
+    if not missing:
+        return "보정할 이상치가 없습니다."
+    j = missing[0]
+    target = TARGETS[j]
+    try:
+        model = get_model(target)
+    except FileNotFoundError:
+        return f"오류: '{target}' 모델 파일이 없습니다. (학습 먼저 실행 필요)"
+    X = feature_matrix(values, times, [last], model_features(model), extras)
+    value = predict(model, X)[0]
+
+    new_line = _replace_fields(lines[-1], {col_map[target]: value}, encoding)
+    if output_path is None:
+        _patch_last_line(input_path, last_offset, new_line.encode(encoding))
+    else:
+        _append_or_patch(output_path, header, new_line)
+
+    timestamp = df['Timestamp'].iloc[-1]
+    return f"{timestamp} 행, {target} 열에 {value:.2f} 저장"
@@ -0,0 +1,338 @@
+# outlier_fix/realtime_daemon.py
+# 사용 예)
+#   python -m outlier_fix.realtime_daemon --input data/outlier/priva_delete_error.csv \
+#       --output data/outlier/priva_realtime.csv
+#   python -m outlier_fix.realtime_daemon --db codefarmdb.sqlite --table priva --output out.csv
+import argparse
+import io
+import json
+import os
+import signal
+import threading
+import numpy as np
+import pandas as pd
+from outlier_find.stream_detect import StreamingOutlierDetector
+from outlier_fix.gap_fill import fill_gaps_autoregressive
+from outlier_fix.features import CONTEXT_ROWS, TARGETS, extra_matrix, time_features
+from outlier_fix.model_registry import get_model
+from outlier_fix.predict import load_settings
+from outlier_fix.predict_tail import detect_encoding, read_tail_lines
+from precleaning.db import get_manager
+from utils import get_korea_time
+
+POLL_INTERVAL = 5
+WARMUP_ROWS = 1440   # 시작할 때 탐지 통계를 채울 과거 행 수 (1분 간격 하루)
+STATE_DIR = 'outlier_fix/realtime_state'
+MAX_RETRIES = 3      # 처리에 실패한 묶음을 다시 읽어 재시도할 횟수, 넘으면 실패 파일(dead letter)로 옮김
+
+
+# 파일 끝에 추가되는 줄을 읽는 tail 리더
+# 파일이 교체(rotation, inode 변경)되거나 잘리면(truncation) 처음부터 다시 읽음
+class FileTailer:
+    def __init__(self, path, from_end=True):
+        self.path = path
+        self.header = None
+        self.encoding = 'utf-8'
+        self.inode = None
+        self.offset = 0
+        self.buffer = b''
+        self.from_end = from_end
+        self.rotations = 0
+
+    # 헤더 + 최근 줄로 인코딩을 정하고 헤더를 읽음 (반환: 헤더 byte)
+    def _read_header(self):
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+        lines, _ = read_tail_lines(self.path, CONTEXT_ROWS)
+        self.encoding = detect_encoding(self.path, header + b''.join(lines))
+        self.header = header.decode(self.encoding).lstrip('\ufeff')
+        return header
+
+    def _open(self, st, from_end):
+        header = self._read_header()
+        self.inode = st.st_ino
+        self.offset = st.st_size if from_end else len(header)
+        self.buffer = b''
+
+    # 체크포인트에 저장할 읽은 위치 (아직 줄바꿈이 안 된 조각은 다시 읽도록 뺌)
+    def position(self):
+        if self.inode is None:
+            return None
+        return {'inode': self.inode, 'offset': self.offset - len(self.buffer)}
+
+    # 저장해 둔 위치부터 이어 읽음. 그 사이 파일이 교체되거나 잘렸으면 poll 에서 처음부터 다시 읽음
+    # position 이 None 이면 아직 열지 않은 상태로 되돌림
+    def restore(self, position):
+        if position is None:
+            self.inode = None
+            return
+        self._read_header()
+        self.inode = position['inode']
+        self.offset = position['offset']
+        self.buffer = b''
+
+    # 마지막 확인 이후 추가된 완전한 줄들을 DataFrame 으로 반환 (없으면 None)
+    def poll(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if self.inode is None:
+            self._open(st, self.from_end)
+        elif st.st_ino != self.inode or st.st_size < self.offset:
+            self.rotations += 1
+            self._open(st, from_end=False)
+        if st.st_size == self.offset:
+            return None
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(st.st_size - self.offset)
+        self.offset += len(data)
+        data = self.buffer + data
+        # 아직 줄바꿈이 안 된 마지막 조각은 다음에 이어 읽음
+        cut = data.rfind(b'\n') + 1
+        self.buffer = data[cut:]
+        if cut == 0:
+            return None
+        return pd.read_csv(io.StringIO(self.header + data[:cut].decode(self.encoding)))
+
+    # 시작 시 통계/lag 를 채우기 위해 현재 위치 앞의 최근 n 행을 읽음
+    def history(self, n_rows):
+        if not os.path.exists(self.path):
+            return None
+        lines, _ = read_tail_lines(self.path, n_rows)
+        if not lines:
+            return None
+        if self.header is None:
+            self._read_header()
+        return pd.read_csv(io.StringIO(self.header + b''.join(lines).decode(self.encoding)))
+
+    def pending_bytes(self):
+        try:
+            return max(os.path.getsize(self.path) - self.offset, 0)
+        except FileNotFoundError:
+            return 0
+
+
+# SQLite 테이블에 추가되는 행을 rowid 기준으로 읽는 폴링 리더
+class SqliteTailer:
+    def __init__(self, db_path, table, from_end=True):
+        self.db_path = db_path
+        self.table = table
+        self.last_rowid = None
+        self.from_end = from_end
+        self.rotations = 0
+
+    def _query(self, sql, params=()):
+        return pd.read_sql(sql, get_manager(self.db_path).reader(), params=params)
+
+    def position(self):
+        return None if self.last_rowid is None else {'last_rowid': self.last_rowid}
+
+    def restore(self, position):
+        self.last_rowid = None if position is None else position['last_rowid']
+
+    def _max_rowid(self):
+        return int(self._query(f"SELECT COALESCE(MAX(rowid), 0) AS m FROM [{self.table}];")['m'][0])
+
+    def poll(self):
+        max_rowid = self._max_rowid()
+        if self.last_rowid is None:
+            self.last_rowid = max_rowid if self.from_end else 0
+        elif max_rowid < self.last_rowid:
+            # 테이블을 새로 만든 경우(replace) 처음부터
+            self.rotations += 1
+            self.last_rowid = 0
+        if max_rowid == self.last_rowid:
+            return None
+        df = self._query(f"SELECT rowid AS _rowid, * FROM [{self.table}] WHERE rowid > ? ORDER BY rowid;",
+                         (self.last_rowid,))
+        self.last_rowid = int(df['_rowid'].iloc[-1])
+        return df.drop(columns='_rowid')
+
+    def history(self, n_rows):
+        df = self._query(f"SELECT * FROM [{self.table}] ORDER BY rowid DESC LIMIT ?;", (n_rows,))
+        return df.iloc[::-1].reset_index(drop=True)
+
+    def pending_bytes(self):
+        return 0
+
+
+# 보정 결과를 CSV 파일에 이어 쓰는 출력 저장소
+class CsvWriter:
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, df):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        df.to_csv(self.path, mode='a', index=False, header=new_file,
+                  encoding='utf-8-sig' if new_file else 'utf-8')
+
+
+# 새로 들어온 묶음마다 탐지(StreamingOutlierDetector) → 보정(gap_fill) → 저장
+# 체크포인트(state_path)에는 탐지기 상태와 리더의 읽은 위치를 함께 저장해서, 재시작하면 멈췄던 곳부터 이어 읽음
+# 처리에 실패한 묶음은 읽은 위치/탐지기 상태를 묶음 앞으로 되돌려 다음 확인 때 다시 처리하고,
+# MAX_RETRIES 번 넘게 실패하면 dead_letter 에 원본 행을 남기고 넘어감 (dead_letter 가 없으면 계속 재시도)
+class RealtimeCorrector:
+    def __init__(self, tailer, writer, settings=None, state_path=None, dead_letter=None):
+        if settings is None:
+            settings = load_settings()
+        self.tailer = tailer
+        self.writer = writer
+        self.t_location = settings.get('t_location', 1)
+        self.h_location = settings.get('h_location', 3)
+        self.r_location = settings.get('r_location', 4)
+        self.state_path = state_path
+        self.dead_letter = dead_letter
+        self.detector = None
+        self.context = None   # 직전 묶음의 마지막 CONTEXT_ROWS 행 (lag/이동 평균용, 보정 후 값)
+        self.failures = 0     # 지금 묶음이 연속으로 실패한 횟수
+        self.counters = {
+            'rows_processed': 0,
+            'rows_flagged': 0,
+            'cells_corrected': 0,
+            'batches': 0,
+            'rotations': 0,
+            'errors': 0,
+            'dead_letter_rows': 0,
+            'last_row_time': None,
+            'lag_sec': None,
+            'pending_bytes': 0,
+        }
+        self._load_checkpoint()
+
+    def _columns(self, df):
+        cols = df.columns.tolist()
+        return cols[self.t_location], cols[self.h_location], cols[self.r_location]
+
+    def _load_checkpoint(self):
+        if not (self.state_path and os.path.exists(self.state_path)):
+            return
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if 'detector' not in state:
+            state = {'detector': state}   # 예전 체크포인트는 탐지기 상태만 있음
+        self.detector = StreamingOutlierDetector.from_state(state['detector'])
+        if state.get('tailer'):
+            self.tailer.restore(state['tailer'])
+
+    def _save_checkpoint(self):
+        if not self.state_path or self.detector is None:
+            return
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'detector': self.detector.state_dict(), 'tailer': self.tailer.position()}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _init_detector(self, df):
+        temp_col, humi_col, light_col = self._columns(df)
+        time_col = 'date_time' if 'date_time' in df.columns else df.columns[0]
+        self.detector = StreamingOutlierDetector(temp_col, humi_col, light_col, time_col)
+        # 파일 끝부터 감시할 때만 기존 행으로 통계와 lag 를 채움
+        history = self.tailer.history(WARMUP_ROWS) if self.tailer.from_end else None
+        if history is not None and len(history):
+            self.detector.warm_start(history)
+            self.context = history.tail(CONTEXT_ROWS)
+
+    def process(self, batch):
+        if self.detector is None:
+            self._init_detector(batch)
+        temp_col, humi_col, light_col = self._columns(batch)
+        targets = [temp_col, humi_col, light_col]
+
+        marked, flags = self.detector.update(batch)
+        self.counters['rows_flagged'] += int(flags.any(axis=1).sum())
+
+        # 직전 행들을 앞에 붙여서 lag/이동 평균 특징을 이어감
+        frame = marked if self.context is None else pd.concat([self.context, marked], ignore_index=True)
+        offset = len(frame) - len(marked)
+        times = pd.to_datetime(frame[self.detector.time_col], format='mixed', errors='coerce')
+        values = frame[targets].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        if np.isnan(values[offset:]).any():
+            models = [get_model(name) for name in TARGETS]
+            values, filled, _ = fill_gaps_autoregressive(values, time_features(times), models,
+                                                         extras=extra_matrix(frame))
+            self.counters['cells_corrected'] += int(filled.sum())
+
+        frame[targets] = values
+        result = frame.iloc[offset:]
+        self.writer.write(result)
+        self.context = frame.tail(CONTEXT_ROWS)
+
+        self.counters['rows_processed'] += len(batch)
+        self.counters['batches'] += 1
+        if times.notna().any():
+            last_time = times.dropna().iloc[-1]
+            self.counters['last_row_time'] = str(last_time)
+            # 센서 시각은 한국 시간(시간대 정보 없음)이라 한국 시간 기준으로 비교
+            now = pd.Timestamp(get_korea_time().replace(tzinfo=None))
+            self.counters['lag_sec'] = (now - last_time).total_seconds()
+        return result
+
+    def step(self):
+        position = self.tailer.position()
+        detector = self.detector.state_dict() if self.detector is not None else None
+        context = self.context
+        batch = self.tailer.poll()
+        self.counters['rotations'] = self.tailer.rotations
+        self.counters['pending_bytes'] = self.tailer.pending_bytes()
+        if batch is None or batch.empty:
+            return None
+        try:
+            result = self.process(batch)
+        except Exception as e:
+            self.counters['errors'] += 1
+            self.failures += 1
+            print(f"[오류] 실시간 보정 실패 ({self.failures}회): {e}")
+            if self.dead_letter is None or self.failures <= MAX_RETRIES:
+                # 묶음 앞으로 되돌려서 다음 확인 때 같은 행부터 다시 처리
+                self.tailer.restore(position)
+                self.detector = StreamingOutlierDetector.from_state(detector) if detector else None
+                self.context = context
+                return None
+            self.dead_letter.write(batch)
+            self.counters['dead_letter_rows'] += len(batch)
+            result = None
+        self.failures = 0
+        self._save_checkpoint()
+        return result
+
+    def run(self, interval=POLL_INTERVAL, stop_event=None, status_path=None):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self.step()
+            if status_path:
+                with open(status_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.counters, f, ensure_ascii=False)
+            stop_event.wait(interval)
+        return self.counters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="실시간 센서 파일 이상치 탐지/보정 서비스")
+    parser.add_argument('--input', help="감시할 CSV 파일")
+    parser.add_argument('--db', help="감시할 SQLite DB 경로 (--table 과 함께)")
+    parser.add_argument('--table', help="감시할 테이블")
+    parser.add_argument('--output', required=True, help="보정 결과 CSV")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--from-start', action='store_true', help="기존 행도 처음부터 처리")
+    args = parser.parse_args()
+
+    if args.db:
+        tailer = SqliteTailer(args.db, args.table, from_end=not args.from_start)
+        name = args.table
+    else:
+        tailer = FileTailer(args.input, from_end=not args.from_start)
+        name = os.path.splitext(os.path.basename(args.input))[0]
+    os.makedirs(STATE_DIR, exist_ok=True)
+    corrector = RealtimeCorrector(tailer, CsvWriter(args.output),
+                                  state_path=os.path.join(STATE_DIR, f"{name}_detector.json"),
+                                  dead_letter=CsvWriter(os.path.join(STATE_DIR, f"{name}_failed.csv")))
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    print(f"[시작] {args.input or args.table} 감시 중 (간격 {args.interval}초)")
+    counters = corrector.run(args.interval, stop, os.path.join(STATE_DIR, f"{name}_status.json"))
+    print(f"[종료] {counters}")
@@ -0,0 +1,114 @@
+# outlier_fix/tiered.py
+import time
+import numpy as np
+import pandas as pd
+from outlier_fix.gap_fill import find_runs, fill_gaps_autoregressive
+from outlier_fix.model_registry import get_model
+from outlier_fix.features import time_features, extra_matrix
+
+SHORT_GAP_MAX = 5     # 이 길이(행) 이하 결측 구간은 보간
+LONG_GAP_MIN = 120    # 이 길이 이상은 채우지 않고 결측으로 남김
+
+TIER_INTERP = 'interp'
+TIER_MODEL = 'model'
+TIER_UNFILLED = 'unfilled'
+INTERP_METHODS = ['linear', 'time', 'pchip']   # 추가 인자(order 등) 없이 쓸 수 있는 보간 방식만
+
+
+# 셀마다 자신이 속한 결측 구간 길이 (결측이 아니면 0)
+def gap_lengths(is_nan):
+    lengths = np.zeros(len(is_nan), dtype=np.int64)
+    starts, run_lengths = find_runs(is_nan)
+    if len(starts):
+        rows = np.repeat(starts, run_lengths) + (
+            np.arange(run_lengths.sum()) - np.repeat(np.cumsum(run_lengths) - run_lengths, run_lengths))
+        lengths[rows] = np.repeat(run_lengths, run_lengths)
+    return lengths
+
+
+# 결측 구간 길이에 따라 보정 방식을 나눔
+#   짧은 구간(<= short_max)  : 선형/시간/PCHIP(구간별 3차) 보간 (양 끝 값이 있는 구간만)
+#   중간 구간                : LightGBM 자기회귀 예측 (gap_fill), 보간 못 한 양 끝의 짧은 구간 포함
+#   긴 구간(>= long_min)     : 채우지 않음
+# progress: 중간 구간 예측 진행 콜백 progress(완료 수, 전체 수, 열 이름) (predict_full.correct_outlier_df 와 같음)
+# 반환: (보정된 df, 메시지, 리포트{'cells': 셀별 tier, 'timing': tier별 초, 'counts': tier별 셀 수})
+def correct_outlier_tiered(df, temp_index, humi_index, light_index,
+                           short_max=SHORT_GAP_MAX, long_min=LONG_GAP_MIN, method='linear', progress=None):
+    if method not in INTERP_METHODS:
+        raise ValueError(f"지원하지 않는 보간 방식: {method} ({', '.join(INTERP_METHODS)} 중 선택)")
+    cols = df.columns.tolist()
+    target_list = [cols[temp_index], cols[humi_index], cols[light_index]]
+    time_col = 'date_time' if 'date_time' in df.columns else cols[0]
+    timing = {}
+
+    df_copy = df.copy()
+    times = pd.to_datetime(df_copy[time_col], errors='coerce')
+    df_copy['hour'] = times.dt.hour.fillna(0)
+    df_copy['minute'] = times.dt.minute.fillna(0)
+
+    values = df_copy[target_list].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    original_nan = np.isnan(values)
+    lengths = np.column_stack([gap_lengths(original_nan[:, j]) for j in range(len(target_list))])
+
+    # 1. 짧은 구간 보간
+    start = time.perf_counter()
+    short = original_nan & (lengths <= short_max)
+    if short.any():
+        frame = pd.DataFrame(values)
+        if method == 'time' and times.notna().all():
+            frame.index = pd.DatetimeIndex(times)
+        interp = frame.interpolate(method=method, limit_area='inside').to_numpy()
+        values = np.where(short, interp, values)
+    interp_filled = short & ~np.isnan(values)
+    timing[TIER_INTERP] = time.perf_counter() - start
+
+    # 2. 중간 구간 모델 예측 (보간으로 채운 값은 lag/입력으로 사용)
+    start = time.perf_counter()
+    medium = original_nan & ~interp_filled & (lengths < long_min)
+    if medium.any():
+        models = [get_model(name) for name in ['Temperature', 'Humidity', 'Solar_Radiation']]
+        values, _, _ = fill_gaps_autoregressive(
+            values, time_features(df_copy[time_col]), models,
+            max_gap=long_min - 1, extras=extra_matrix(df_copy),
+            progress=None if progress is None else lambda done, total, j: progress(done, total, target_list[j]))
+    timing[TIER_MODEL] = time.perf_counter() - start
+
+    filled = original_nan & ~np.isnan(values)
+    tier = np.full(values.shape, TIER_UNFILLED, dtype=object)
+    tier[interp_filled] = TIER_INTERP
+    tier[filled & ~interp_filled] = TIER_MODEL
+
+    rows, col_pos = np.nonzero(original_nan)
+    cells = pd.DataFrame({
+        'row': df_copy.index[rows],
+        'column': np.array(target_list, dtype=object)[col_pos],
+        'gap_length': lengths[rows, col_pos],
+        'tier': tier[rows, col_pos],
+    })
+    counts = cells['tier'].value_counts().reindex(
+        [TIER_INTERP, TIER_MODEL, TIER_UNFILLED], fill_value=0).to_dict()
+
+    for j, target in enumerate(target_list):
+        if filled[:, j].any():
+            df_copy[target] = values[:, j]
+
+    msg = (f"보간 {counts[TIER_INTERP]}칸, 모델 {counts[TIER_MODEL]}칸 보정, "
+           f"미보정 {counts[TIER_UNFILLED]}칸") if len(cells) else "수정할 결측치 없음"
+    return df_copy, msg, {'cells': cells, 'timing': timing, 'counts': counts}
+
+
+# 리포트를 작업 결과(JSON)로 저장할 수 있는 형태로: {'counts', 'timing': tier별 초, 'cells': [셀별 dict]}
+def report_to_dict(report):
+    return {
+        'counts': {tier: int(n) for tier, n in report['counts'].items()},
+        'timing': {tier: round(sec, 3) for tier, sec in report['timing'].items()},
+        'cells': report['cells'].astype({'row': str, 'gap_length': int}).to_dict('records'),
+    }
+
+
+# (아래는 모듈 실행용 샘플, 실제 서비스에서는 사용 안함)
+if __name__ == "__main__":
+    df = pd.read_csv("sample.csv")
+    fixed, msg, report = correct_outlier_tiered(df, 1, 2, 3)
+    print(msg)
+    print(report['timing'])
@@ -1,14 +1,40 @@
 # outlier_fix/train_models.py
+import numpy as np
 import pandas as pd
 import lightgbm as lgb
 from sklearn.model_selection import train_test_split
 import joblib
 import os
 import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from outlier_fix.feature_store import STORE_DIR, sync_store
+from outlier_fix.features import (REQUIRED, all_feature_names, legacy_feature_names, model_features,
+                                  predict, prune_features)
+from utils import file_lock
 
 SETTINGS_FILE = "config/settings.json"
 file_name = 'data/mc.csv'
 copy_file = 'data/mc_copy.xlsx'
+MODEL_DIR = 'outlier_fix/trained_models'
+TARGET_LIST = ['Temperature', 'Humidity', 'Solar_Radiation']
+
+TRAIN_WINDOW_DAYS = 30     # 전체 학습에 쓸 최근 기간 (일), 설정 'train_window_days' 로 변경
+
+# 증분 학습 설정
+FULL_REFIT_DAYS = 7        # 전체 재학습 주기 (일)
+INCREMENTAL_TREES = 100    # 증분 학습 때 이어 붙일 최대 트리 수
+MIN_NEW_ROWS = 60          # 새 행이 이보다 적으면 증분 학습 안 함
+TRAIN_STATE_FILE = 'train_state.json'
+TRAIN_RUN_LOG = 'train_runs.jsonl'
+TRAIN_LOCK_FILE = 'train.lock'   # 같은 모델 폴더에 학습이 동시에 두 개 돌지 않도록 잡는 잠금 파일
+BEST_PARAMS_FILE = 'best_params.json'   # tune_models 결과, 있으면 전체 학습에 사용
+LATENCY_REPEATS = 20   # 한 행 예측 지연 측정 반복 수
+LATENCY_THREADS = 1    # 예측 지연 측정 스레드 수 (학습 스레드 수와 상관없이 고정해 실행끼리 비교 가능하게)
+PRUNE_TOLERANCE = 0.005   # 가지친 모델의 val_rmse 가 전체 특징 모델보다 이 비율까지 나빠도 가지친 모델 사용
+PARAM_KEYS = ['learning_rate', 'num_leaves', 'min_child_samples', 'colsample_bytree', 'reg_lambda']
 
 
 def load_settings():
@@ -24,100 +50,365 @@ def load_settings():
             "t_location": 1,
         }
 
-def train_model():
-    settings = load_settings()
-    h_location = settings.get('h_location', 3)
-    r_location = settings.get('r_location', 4)
-    t_location = settings.get('t_location', 1)
-
-    # CSV → 엑셀 변환
-    try:
-        df = pd.read_csv(file_name)
-        df.to_excel(copy_file, index=False)
-    except Exception as e:
-        print(f"파일 변환 실패: {e}")
-
-
-    array = [name for _, name in sorted([
-        (h_location, 'Humidity'),
-        (t_location, 'Temperature'),
-        (r_location, 'Solar_Radiation')
-    ])]
+# 설정된 열 위치로 CSV 를 읽어 학습용 특징 행렬을 만듦
+# 특징은 feature_store 에 저장/캐시돼 있어 새로 추가된 행만 파싱하고 계산함 (엑셀 변환/읽기 없음)
+#   columns     : 만들 열 이름 (대상 + features.py 의 특징 이름)
+#   window_days : 마지막 시각 기준 최근 며칠만 (None 이면 전체)
+#   since       : 이 시각 이후 행만 (증분 학습용)
+# 기간은 저장소의 시각 인덱스로 행 범위를 찾고, 그 범위의 특징만 계산해서 읽음
+#   timings : dict 를 주면 단계별 소요 시간(load_sec, features_sec)을 기록
+#   store_dir : 특징 저장소 폴더 (벤치마크 등에서 따로 쓸 때)
+# 반환: (대상 값과 lag_1 이 모두 있는 행의 행렬, 마지막 시각)
+def load_training_matrix(input_file=file_name, settings=None, columns=None, window_days=TRAIN_WINDOW_DAYS,
+                         since=None, timings=None, store_dir=STORE_DIR):
+    timings = {} if timings is None else timings
+    if settings is None:
+        settings = load_settings()
+    columns = columns or TARGET_LIST + ['hour', 'minute', 'temp_lag_1', 'humi_lag_1', 'solar_lag_1']
 
     # --- 0. 데이터 불러오기 및 전처리 ---
-    use_cols = [0, h_location, r_location, t_location]
     try:
-        # CSV 대신 CSV 파일 그대로 유지, 단 usecols 인덱스 적용 (pandas read_csv에 usecols 인덱스 가능)
-        df = pd.read_excel(copy_file, header=0, usecols=use_cols)
-        df.columns = ['Timestamp'] + array  # 위치 변수 기반 동적 컬럼명 지정
-
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-        df['Humidity'] = pd.to_numeric(df['Humidity'], errors='coerce')
-        df['Solar_Radiation'] = pd.to_numeric(df['Solar_Radiation'], errors='coerce')
-        df['Temperature'] = pd.to_numeric(df['Temperature'], errors='coerce')
-
-        # 최근 1개월치 데이터만 학습(1분 간격 데이터 기준)
-        num_recent_rows = 44580
-        if len(df) > num_recent_rows:
-            df = df.tail(num_recent_rows).reset_index(drop=True)
+        start_time = time.perf_counter()
+        store = sync_store(input_file, settings, store_dir)
+        timings['load_sec'] = round(time.perf_counter() - start_time, 3)
+        # --- 1. 특징 공학 (Feature Engineering): features.feature_matrix 결과를 저장소에 캐시 ---
+        start_time = time.perf_counter()
+        # 최근 window_days 일치 데이터만 학습 (행 수가 아니라 시각 기준이라 빠진 행이 있어도 기간이 같음)
+        start = max(store.window_start(since=since), store.last_days_start(window_days))
+        matrix = np.array(store.derived_features(columns, start))
+        stamps = store.timestamps()[start:]
+        last_timestamp = str(pd.Timestamp(int(stamps.max()))) if len(stamps) else None
 
     except FileNotFoundError:
-        print(f"오류: {copy_file} 파일을 찾을 수 없습니다.")
+        print(f"오류: {input_file} 파일을 찾을 수 없습니다.")
         exit()
     except Exception as e:
         print(f"데이터 로드 중 오류 발생: {e}")
         exit()
 
-    # --- 1. 특징 공학 (Feature Engineering) ---
-    df['hour'] = df['Timestamp'].dt.hour
-    df['minute'] = df['Timestamp'].dt.minute
-    df['temp_lag_1'] = df['Temperature'].shift(1)
-    df['humi_lag_1'] = df['Humidity'].shift(1)
-    df['solar_lag_1'] = df['Solar_Radiation'].shift(1)
-
     # NaN 생긴 행 제거
-    df = df.dropna(subset=['temp_lag_1', 'humi_lag_1', 'solar_lag_1'])
+    required = [i for i, col in enumerate(columns) if col in REQUIRED]
+    matrix = matrix[~np.isnan(matrix[:, required]).any(axis=1)]
+    timings['features_sec'] = round(time.perf_counter() - start_time, 3)
+    return matrix, last_timestamp
 
-    # --- 2. 모델 학습 ---
-    target_list = ['Temperature', 'Humidity', 'Solar_Radiation']
-    df_train_full = df.dropna(subset=target_list)
 
-    model_dir = "outlier_fix/trained_models"
-    os.makedirs("outlier_fix/trained_models", exist_ok=True)
+def load_train_state(model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, TRAIN_STATE_FILE)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
 
-    for target_col in target_list:
-        features = [col for col in df.columns if col not in ['Timestamp', target_col]]
-        X_train = df_train_full[features]
-        y_train = df_train_full[target_col]
 
-        if X_train.empty or y_train.empty:
-            print(f"[경고] {target_col} 학습용 데이터 부족, 학습 스킵")
-            continue
+def save_train_state(state, model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, TRAIN_STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
 
-        X_train_sub, X_val, y_train_sub, y_val = train_test_split(
-            X_train, y_train, test_size=0.2, shuffle=False, random_state=42
-        )
 
-        model = lgb.LGBMRegressor(
-            objective='regression',
-            metric='rmse',
-            n_estimators=1000,
-            random_state=42,
-            learning_rate=0.05
-        )
+# 학습 실행 1회 = JSONL 1줄
+#   {'time', 'mode', 'feature_set', 'rows', 'stages': {load_sec, features_sec, train_sec, total_sec},
+#    'targets': [대상별 rows, best_iteration, val_rmse, fit_sec, save_sec, model_bytes,
+#                predict_row_ms, predict_10k_ms, predict_threads, ...]}
+def write_run_log(report, mode, model_dir=MODEL_DIR, stages=None, feature_set=None):
+    record = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'mode': mode,
+        'feature_set': feature_set,
+        'rows': max((row['rows'] for row in report), default=0),
+        'stages': stages or {},
+        'targets': report,
+    }
+    with open(os.path.join(model_dir, TRAIN_RUN_LOG), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+# 저장된 학습 실행 기록 (최신순)
+def read_run_log(model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, TRAIN_RUN_LOG)
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # 쓰다 끊긴 줄은 무시
+    return records[::-1]
+
+
+# 예측 지연 시간 측정: 한 행씩(ms/행), 10k 행 한 번에(ms/10k 행)
+# 다른 대상 학습과 겹치지 않도록 학습이 모두 끝난 뒤 대상별로 차례로, num_threads 스레드로 측정
+def measure_predict_latency(model, X, repeats=LATENCY_REPEATS, num_threads=LATENCY_THREADS):
+    row = X[-1:]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        predict(model, row, num_threads)
+    per_row = (time.perf_counter() - start) / repeats * 1000
+    batch = np.resize(X, (10000, X.shape[1]))
+    start = time.perf_counter()
+    predict(model, batch, num_threads)
+    per_10k = (time.perf_counter() - start) * 1000
+    return round(per_row, 4), round(per_10k, 2)
+
+
+# 전체 재학습을 할 차례인지 (상태 파일/모델이 없거나 FULL_REFIT_DAYS 가 지났으면 전체)
+def full_refit_due(state, model_dir=MODEL_DIR, full_refit_days=FULL_REFIT_DAYS):
+    if not state.get('last_full_refit') or not state.get('last_timestamp'):
+        return True
+    if not all(os.path.exists(f'{model_dir}/model_{t}.pkl') for t in TARGET_LIST):
+        return True
+    if full_refit_days is None:
+        return False
+    last = datetime.fromisoformat(state['last_full_refit'])
+    return datetime.now() - last >= timedelta(days=full_refit_days)
+
+
+# 대상별 튜닝된 LightGBM 파라미터 {대상: {파라미터: 값}} (tune_models 가 저장, 없으면 빈 dict)
+def load_best_params(model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, BEST_PARAMS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    return {target: {key: value for key, value in saved[target].items() if key in PARAM_KEYS}
+            for target in TARGET_LIST if target in saved}
+
+
+def _fit_full(X_train_sub, y_train_sub, X_val, y_val, features, num_threads, params=None):
+    model = lgb.LGBMRegressor(**{
+        'objective': 'regression',
+        'metric': 'rmse',
+        'n_estimators': 1000,
+        'random_state': 42,
+        'learning_rate': 0.05,
+        'n_jobs': num_threads,
+        **(params or {}),
+    })
+
+    model.fit(
+        X_train_sub, y_train_sub,
+        eval_set=[(X_val, y_val)],
+        eval_metric='rmse',
+        feature_name=features,
+        callbacks=[lgb.early_stopping(50, verbose=False)]
+    )
+    return model
 
+
+# 대상 하나 학습 후 model_filename + '.tmp' 에 저장 (실제 모델 파일 교체는 모든 대상이 끝난 뒤 _promote_models)
+# 반환: (결과 dict, 모델, 지연 측정용 입력) 또는 데이터가 없으면 None
+# matrix 는 columns 순서의 공용 특징 행렬, features 는 이 대상의 입력 특징
+# prune=True 면 전체 특징으로 한 번 학습한 뒤 gain 중요도로 특징을 줄여 다시 학습
+#   다시 학습한 모델의 val_rmse 가 PRUNE_TOLERANCE 안에서 나빠지지 않았을 때만 가지친 모델을 씀 ('kept' 에 기록)
+def _fit_target(target_col, matrix, columns, features, mode, model_filename, num_threads, prune=False,
+                params=None):
+    start = time.perf_counter()
+    y_train = matrix[:, columns.index(target_col)]
+
+    if len(matrix) == 0:
+        print(f"[경고] {target_col} 학습용 데이터 부족, 학습 스킵")
+        return None
+
+    def split(names):
+        X_train = matrix[:, [columns.index(col) for col in names]]
+        return train_test_split(X_train, y_train, test_size=0.2, shuffle=False, random_state=42)
+
+    X_train_sub, X_val, y_train_sub, y_val = split(features)
+    unpruned_rmse = None
+    kept = None
+
+    if mode == 'incremental':
+        prev_model = joblib.load(model_filename)
+        prev_trees = prev_model.booster_.num_trees()
+        model = lgb.LGBMRegressor(**{**prev_model.get_params(),
+                                     'n_estimators': INCREMENTAL_TREES, 'n_jobs': num_threads})
         model.fit(
             X_train_sub, y_train_sub,
             eval_set=[(X_val, y_val)],
             eval_metric='rmse',
-            callbacks=[lgb.early_stopping(50, verbose=False)]
+            feature_name=features,
+            init_model=prev_model.booster_,
+            callbacks=[lgb.early_stopping(10, verbose=False)]
         )
+    else:
+        prev_trees = 0
+        model = _fit_full(X_train_sub, y_train_sub, X_val, y_val, features, num_threads, params)
+        if prune:
+            pruned = prune_features(features, model.booster_.feature_importance('gain'))
+            if len(pruned) < len(features):
+                unpruned_rmse = float(model.best_score_['valid_0']['rmse'])
+                P_train_sub, P_val, _, _ = split(pruned)
+                pruned_model = _fit_full(P_train_sub, y_train_sub, P_val, y_val, pruned, num_threads, params)
+                kept = 'unpruned'
+                if pruned_model.best_score_['valid_0']['rmse'] <= unpruned_rmse * (1 + PRUNE_TOLERANCE):
+                    kept = 'pruned'
+                    features, model, X_train_sub, X_val = pruned, pruned_model, P_train_sub, P_val
+
+    fit_sec = time.perf_counter() - start
+    start = time.perf_counter()
+    joblib.dump(model, model_filename + '.tmp')
+    # print(f"{target_col} 모델 저장 완료 ({model_filename})")
+    save_sec = time.perf_counter() - start
+    total_trees = model.booster_.num_trees()
+    row = {
+        'target': target_col,
+        'rows': len(matrix),
+        'features': features,
+        'best_iteration': int(model.best_iteration_ or total_trees),
+        'trees_added': total_trees - prev_trees,
+        'total_trees': total_trees,
+        'val_rmse': float(model.best_score_['valid_0']['rmse']),
+        'unpruned_rmse': unpruned_rmse,
+        'kept': kept,
+        'fit_sec': round(fit_sec, 3),
+        'save_sec': round(save_sec, 3),
+        'model_bytes': os.path.getsize(model_filename + '.tmp'),
+    }
+    return row, model, X_val if len(X_val) else X_train_sub
+
+
+# 임시 파일(.tmp)을 실제 모델 파일로 교체 (os.replace 라 읽는 쪽은 이전 모델 또는 새 모델만 봄)
+def _promote_models(report, model_paths):
+    for row in report:
+        path = model_paths[row['target']]
+        os.replace(path + '.tmp', path)
+
+
+def _discard_models(model_paths):
+    for path in model_paths.values():
+        if os.path.exists(path + '.tmp'):
+            os.remove(path + '.tmp')
+
+
+# mode
+#   'full'        : 최근 한 달 데이터로 처음부터 학습 (기존 동작)
+#   'incremental' : 지난 학습 이후 추가된 행만으로 기존 부스터에 트리를 이어 붙임 (init_model)
+#   'auto'        : 평소엔 incremental, FULL_REFIT_DAYS 마다 full
+# jobs    : 동시에 학습할 대상 수 (None 이면 대상 수만큼)
+# threads : 전체 CPU 코어 예산, 대상 하나당 threads // jobs 개 스레드 사용 (None 이면 os.cpu_count())
+# feature_set : 'rich' (features.py 전체 후보 → 중요도 가지치기) 또는 'legacy' (hour, minute, lag_1 만)
+# progress : progress(완료 단계, 전체 단계, 이름) 콜백. 데이터 로드 후, 대상 하나가 끝날 때마다, 모델 교체 직전에 호출
+#            콜백에서 예외를 내면 학습을 중단함 (아직 시작 안 한 대상은 취소, 모델 파일과 train_state 는 그대로)
+# copy_path 는 예전 엑셀 복사본 경로로, 호출부 호환을 위해 인자만 남겨 둠
+# store_dir : 특징 저장소 폴더 (기본 data/feature_store)
+# 같은 model_dir 의 학습은 TRAIN_LOCK_FILE 잠금으로 한 번에 하나만 실행 (다른 학습이 끝날 때까지 기다림)
+# 반환: 대상별 결과 리스트 (write_run_log 의 'targets' 항목과 같음)
+def train_model(input_file=file_name, copy_path=copy_file, model_dir=MODEL_DIR, mode='full',
+                jobs=None, threads=None, feature_set=None, progress=None, store_dir=STORE_DIR):
+    os.makedirs(model_dir, exist_ok=True)
+    with file_lock(os.path.join(model_dir, TRAIN_LOCK_FILE)):
+        return _train_locked(input_file, model_dir, mode, jobs, threads, feature_set, progress, store_dir)
+
+
+def _train_locked(input_file, model_dir, mode, jobs, threads, feature_set, progress, store_dir):
+    run_start = time.perf_counter()
+    settings = load_settings()
+    jobs = jobs or settings.get('train_jobs')
+    threads = threads or settings.get('train_threads')
+    state = load_train_state(model_dir)
+    if mode == 'auto':
+        mode = 'full' if full_refit_due(state, model_dir) else 'incremental'
+    if mode == 'incremental' and full_refit_due(state, model_dir, full_refit_days=None):
+        mode = 'full'  # 이어 붙일 모델이 없으면 전체 학습
+
+    # 대상별 입력 특징: 증분 학습은 기존 모델의 특징 그대로, 전체 학습은 feature_set 의 후보 전부
+    feature_set = feature_set or settings.get('train_features', 'rich')
+    target_list = TARGET_LIST
+    if mode == 'incremental':
+        candidates = {t: model_features(joblib.load(f'{model_dir}/model_{t}.pkl')) for t in target_list}
+    elif feature_set == 'legacy':
+        candidates = {t: legacy_feature_names(t) for t in target_list}
+    else:
+        candidates = {t: all_feature_names(t) for t in target_list}
+    # 특징 행렬은 한 번만 만들어 모든 대상 학습이 같이 씀 (스레드라 복사 없이 공유)
+    columns = list(target_list)
+    for t in target_list:
+        columns += [col for col in candidates[t] if col not in columns]
+
+    stages = {}
+    if mode == 'incremental':
+        matrix, last_timestamp = load_training_matrix(input_file, settings, columns, window_days=None,
+                                                      since=state['last_timestamp'], timings=stages,
+                                                      store_dir=store_dir)
+        if len(matrix) < MIN_NEW_ROWS:
+            print(f"[안내] 새 데이터 {len(matrix)}행, 증분 학습 스킵")
+            return []
+    else:
+        matrix, last_timestamp = load_training_matrix(input_file, settings, columns,
+                                                      settings.get('train_window_days', TRAIN_WINDOW_DAYS),
+                                                      timings=stages, store_dir=store_dir)
+
+    # --- 2. 모델 학습 ---
+    jobs = max(1, min(jobs or len(target_list), len(target_list)))
+    threads = threads or os.cpu_count() or 1
+    num_threads = max(1, threads // jobs)
+
+    prune = mode == 'full' and feature_set != 'legacy'
+    best_params = load_best_params(model_dir)
+    model_paths = {target_col: f'{model_dir}/model_{target_col}.pkl' for target_col in target_list}
+    tasks = [(target_col, matrix, columns, candidates[target_col], mode,
+              model_paths[target_col], num_threads, prune, best_params.get(target_col))
+             for target_col in target_list]
+    steps = len(tasks) + 1
+    if progress is not None:
+        progress(1, steps, '데이터 로드')
+    train_start = time.perf_counter()
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(_fit_target, *task) for task in tasks]
+            try:
+                for task, future in zip(tasks, futures):
+                    results.append(future.result())
+                    if progress is not None:
+                        progress(1 + len(results), steps, task[0])
+            except BaseException:
+                # 취소/오류: 대기 중인 대상은 실행하지 않고, 실행 중인 대상만 끝날 때까지 기다림
+                executor.shutdown(cancel_futures=True)
+                raise
+        stages['train_sec'] = round(time.perf_counter() - train_start, 3)
+        # 예측 지연은 학습 스레드가 모두 끝난 뒤 대상별로 차례로 측정
+        report = []
+        for result in results:
+            if result is None:
+                continue
+            row, model, X_latency = result
+            row['predict_row_ms'], row['predict_10k_ms'] = measure_predict_latency(model, X_latency)
+            row['predict_threads'] = LATENCY_THREADS
+            report.append(row)
+        # 모델 파일을 바꾸기 전에 마지막으로 취소 확인
+        if progress is not None:
+            progress(steps, steps, '모델 저장')
+    except BaseException:
+        _discard_models(model_paths)
+        raise
+    stages['total_sec'] = round(time.perf_counter() - run_start, 3)
 
-        model_filename = f'{model_dir}/model_{target_col}.pkl'
-        joblib.dump(model, model_filename)
-        # print(f"{target_col} 모델 저장 완료 ({model_filename})")
+    # 모델 교체와 train_state 저장을 같은 단계에서 (모든 대상 학습이 끝난 뒤에만)
+    if report:
+        _promote_models(report, model_paths)
+        state['last_timestamp'] = last_timestamp
+        if mode == 'full':
+            state['last_full_refit'] = datetime.now().isoformat(timespec='seconds')
+        save_train_state(state, model_dir)
+        write_run_log(report, mode, model_dir, stages, feature_set)
+    return report
 
 # print("모든 모델 학습 및 저장 완료")
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=['full', 'incremental', 'auto'], default='full')
+    parser.add_argument('--jobs', type=int, default=None, help="동시에 학습할 대상 수")
+    parser.add_argument('--threads', type=int, default=None, help="전체 CPU 코어 예산")
+    parser.add_argument('--features', choices=['rich', 'legacy'], default=None)
+    args = parser.parse_args()
+    for row in train_model(mode=args.mode, jobs=args.jobs, threads=args.threads, feature_set=args.features):
+        print(row)
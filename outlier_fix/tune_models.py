@@ -0,0 +1,163 @@
+# outlier_fix/tune_models.py
+# 보정 모델 하이퍼파라미터 탐색
+#   - 시간 순서를 지키는 확장 창(expanding window) 교차 검증 (TimeSeriesSplit)
+#   - 후보 조합을 프로세스 풀에서 병렬 평가, 조기 종료 사용
+#   - 전체 제한 시간(budget_sec)이 지나면 남은 후보는 취소
+# 가장 좋은 조합을 모델 폴더의 best_params.json 에 저장하면 train_model 이 자동으로 사용함
+# 사용 예) python -m outlier_fix.tune_models --budget 600 --jobs 2 --trials 20
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FutureTimeout
+from datetime import datetime
+import lightgbm as lgb
+import numpy as np
+from sklearn.model_selection import TimeSeriesSplit
+from outlier_fix.features import all_feature_names, legacy_feature_names
+from outlier_fix.train_models import (MODEL_DIR, TARGET_LIST, file_name, load_settings, load_training_matrix,
+                                      BEST_PARAMS_FILE, TRAIN_WINDOW_DAYS)
+
+# 탐색 범위 (작게 유지: 조합 수가 곧 학습 횟수)
+PARAM_SPACE = {
+    'learning_rate': [0.03, 0.05, 0.1],
+    'num_leaves': [15, 31, 63],
+    'min_child_samples': [20, 50, 100],
+    'colsample_bytree': [0.8, 1.0],
+    'reg_lambda': [0.0, 1.0],
+}
+N_SPLITS = 3
+N_TRIALS = 20
+BUDGET_SEC = 600
+
+
+# PARAM_SPACE 에서 중복 없이 n 개 조합 (항상 현재 기본값 조합을 포함)
+def sample_params(n_trials=N_TRIALS, seed=42):
+    keys = list(PARAM_SPACE)
+    grid = [dict(zip(keys, combo)) for combo in itertools.product(*PARAM_SPACE.values())]
+    default = {'learning_rate': 0.05, 'num_leaves': 31, 'min_child_samples': 20,
+               'colsample_bytree': 1.0, 'reg_lambda': 0.0}
+    rest = [params for params in grid if params != default]
+    random.Random(seed).shuffle(rest)
+    return [default] + rest[:max(n_trials - 1, 0)]
+
+
+# 후보 하나를 확장 창 교차 검증으로 평가 (프로세스 풀 작업)
+# matrix_path 는 np.save 로 저장한 공용 행렬, memmap 으로 열어서 복사 없이 사용
+def evaluate(matrix_path, columns, target, features, params, n_splits, deadline, num_threads):
+    matrix = np.load(matrix_path, mmap_mode='r')
+    X = np.asarray(matrix[:, [columns.index(col) for col in features]])
+    y = np.asarray(matrix[:, columns.index(target)])
+    scores, iterations = [], []
+    for train_idx, val_idx in TimeSeriesSplit(n_splits=n_splits).split(X):
+        if time.time() > deadline:
+            break
+        model = lgb.LGBMRegressor(objective='regression', metric='rmse', n_estimators=1000,
+                                  random_state=42, n_jobs=num_threads, verbose=-1, **params)
+        model.fit(X[train_idx], y[train_idx], eval_set=[(X[val_idx], y[val_idx])], eval_metric='rmse',
+                  callbacks=[lgb.early_stopping(50, verbose=False)])
+        scores.append(model.best_score_['valid_0']['rmse'])
+        iterations.append(model.best_iteration_)
+    if len(scores) < n_splits:
+        return None  # 제한 시간 안에 모든 fold 를 못 끝낸 후보는 버림
+    return {'target': target, 'params': params, 'cv_rmse': float(np.mean(scores)),
+            'fold_rmse': [float(s) for s in scores], 'best_iteration': int(np.mean(iterations))}
+
+
+# 대상별 탐색 후 best_params.json 저장. 반환: {대상: 최적 결과}
+# feature_set : 'rich' | 'legacy' (기본 settings 의 train_features), train_model 전체 학습과 같은 후보 특징으로 평가
+def tune_models(input_file=file_name, model_dir=MODEL_DIR, n_trials=N_TRIALS, budget_sec=BUDGET_SEC,
+                jobs=None, n_splits=N_SPLITS, targets=None, feature_set=None):
+    start = time.time()
+    deadline = start + budget_sec
+    settings = load_settings()
+    targets = targets or TARGET_LIST
+    jobs = jobs or settings.get('train_jobs') or os.cpu_count() or 1
+    num_threads = max(1, (settings.get('train_threads') or os.cpu_count() or 1) // jobs)
+
+    # best_params 는 전체 학습에서 가지치기 전의 후보 특징 전부에 쓰이므로 같은 특징으로 평가
+    # (현재 모델의 특징은 가지치기된 일부일 수 있음)
+    feature_set = feature_set or settings.get('train_features', 'rich')
+    feature_names = legacy_feature_names if feature_set == 'legacy' else all_feature_names
+    features = {target: feature_names(target) for target in targets}
+    columns = list(TARGET_LIST)
+    for target in targets:
+        columns += [col for col in features[target] if col not in columns]
+    matrix, _ = load_training_matrix(input_file, settings, columns,
+                                     settings.get('train_window_days', TRAIN_WINDOW_DAYS))
+
+    candidates = sample_params(n_trials)
+    results = {target: [] for target in targets}
+    failures = {target: [] for target in targets}
+    with tempfile.TemporaryDirectory() as tmp:
+        matrix_path = os.path.join(tmp, 'matrix.npy')
+        np.save(matrix_path, matrix)
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        futures = {executor.submit(evaluate, matrix_path, columns, target, features[target], params,
+                                   n_splits, deadline, num_threads): (target, params)
+                   for params in candidates for target in targets}
+        try:
+            for future in as_completed(futures, timeout=max(deadline - time.time(), 0)):
+                target, params = futures[future]
+                # 후보 하나가 실패해도 (데이터가 fold 수보다 적은 경우 등) 나머지 결과는 살림
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failures[target].append({'params': params, 'error': f"{type(e).__name__}: {e}"})
+                    continue
+                if result is not None:
+                    results[target].append(result)
+        except FutureTimeout:
+            print(f"[안내] 제한 시간 {budget_sec}초 초과, 남은 후보 취소")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    best = {}
+    for target in targets:
+        if failures[target]:
+            print(f"[경고] {target} 후보 {len(failures[target])}개 실패: {failures[target][-1]['error']}")
+        if not results[target]:
+            print(f"[경고] {target} 평가 완료된 후보 없음")
+            continue
+        top = min(results[target], key=lambda r: r['cv_rmse'])
+        best[target] = {**top['params'], 'cv_rmse': top['cv_rmse'], 'best_iteration': top['best_iteration'],
+                        'trials': len(results[target]), 'failed': len(failures[target]),
+                        'feature_set': feature_set}
+
+    if best:
+        save_best_params(best, model_dir, elapsed=time.time() - start)
+    return best
+
+
+def save_best_params(best, model_dir=MODEL_DIR, elapsed=None):
+    path = os.path.join(model_dir, BEST_PARAMS_FILE)
+    saved = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    saved.update(best)
+    saved['_tuned_at'] = datetime.now().isoformat(timespec='seconds')
+    if elapsed is not None:
+        saved['_elapsed_sec'] = round(elapsed, 1)
+    os.makedirs(model_dir, exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(saved, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', default=file_name)
+    parser.add_argument('--trials', type=int, default=N_TRIALS, help="대상별 평가할 조합 수")
+    parser.add_argument('--budget', type=float, default=BUDGET_SEC, help="전체 제한 시간 (초)")
+    parser.add_argument('--jobs', type=int, default=None, help="동시에 평가할 후보 수 (프로세스)")
+    parser.add_argument('--splits', type=int, default=N_SPLITS)
+    parser.add_argument('--features', choices=['rich', 'legacy'], default=None,
+                        help="평가할 후보 특징 (기본 settings 의 train_features)")
+    args = parser.parse_args()
+    for target, result in tune_models(args.input, n_trials=args.trials, budget_sec=args.budget,
+                                      jobs=args.jobs, n_splits=args.splits, feature_set=args.features).items():
+        print(target, result)
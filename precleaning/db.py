@@ -0,0 +1,124 @@
+# db.py
+# codefarmdb.sqlite 연결 관리
+#   - DB 경로: 환경 변수 CODEFARM_DB > config/settings.json 의 'db_path' > 'codefarmdb.sqlite'
+#   - 읽기: 스레드마다 연결 하나를 계속 재사용 (Streamlit 세션 스레드, 워커 스레드 각각)
+#   - 쓰기: 프로세스에 연결 하나, 잠금으로 한 번에 하나씩 (BEGIN IMMEDIATE 트랜잭션)
+#   - WAL 이라 쓰는 동안에도 읽기는 막히지 않음. 다른 프로세스가 쓰는 중이면 busy_timeout 동안 기다리고 재시도
+#   - cached_statements 로 같은 SQL 의 prepared statement 를 연결마다 캐시
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+SETTINGS_FILE = "config/settings.json"
+DEFAULT_DB = 'codefarmdb.sqlite'
+BUSY_TIMEOUT_SEC = 10
+STATEMENT_CACHE = 256
+WRITE_RETRIES = 5
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -65536,        # KiB 단위 (64MB)
+    'mmap_size': 268435456,      # 256MB
+}
+
+
+def resolve_db_path():
+    if os.environ.get('CODEFARM_DB'):
+        return os.environ['CODEFARM_DB']
+    if os.path.exists(SETTINGS_FILE):
+        with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get('db_path', DEFAULT_DB)
+    return DEFAULT_DB
+
+
+DB_PATH = resolve_db_path()
+
+
+def connect(db_path=DB_PATH, check_same_thread=True):
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SEC, cached_statements=STATEMENT_CACHE,
+                           check_same_thread=check_same_thread)
+    for key, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {key}={value};")
+    return conn
+
+
+def _locked(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+class ConnectionManager:
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._pid = os.getpid()
+
+    # fork 된 자식 프로세스(ProcessPoolExecutor)는 부모의 연결을 쓰면 안 되므로 새로 엶
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._write_lock = threading.Lock()
+            self._writer = None
+            self._pid = os.getpid()
+
+    # 현재 스레드의 읽기 연결 (닫지 말고 그대로 씀)
+    def reader(self):
+        self._check_pid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    # 쓰기 트랜잭션. with 블록이 끝나면 commit, 예외면 rollback
+    @contextmanager
+    def writer(self):
+        self._check_pid()
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = connect(self.db_path, check_same_thread=False)
+            conn = self._writer
+            for attempt in range(WRITE_RETRIES):
+                try:
+                    conn.execute("BEGIN IMMEDIATE;")
+                    break
+                except sqlite3.OperationalError as e:
+                    if not _locked(e) or attempt == WRITE_RETRIES - 1:
+                        raise
+                    time.sleep(0.1 * 2 ** attempt)
+            try:
+                yield conn
+                if conn.in_transaction:
+                    conn.commit()
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+# DB 파일별 공용 관리자
+def get_manager(db_path=None):
+    path = os.path.abspath(db_path or DB_PATH)
+    with _managers_lock:
+        if path not in _managers:
+            _managers[path] = ConnectionManager(path)
+        return _managers[path]
@@ -2,7 +2,7 @@
 import os
 import glob
 import pandas as pd
-import sqlite3
+from precleaning.timeseries_db import DB_PATH, ingest_frame
 
 try:
     import chardet
@@ -107,14 +107,12 @@ def clean_for_analysis(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def make_clean_csvs_to_db(base_path: str = BASE_PATH,
-                          db_path: str = 'codefarmdb.sqlite'):
+                          db_path: str = DB_PATH):
     csv_files = glob.glob(os.path.join(base_path, "*.csv"))
     if not csv_files:
         print(f"[알림] '{base_path}' 에서 CSV 파일을 찾지 못했습니다.")
         return
 
-    conn = sqlite3.connect(db_path)
-
     for path in csv_files:
         if isinstance(path, str):
             filename = os.path.basename(path)
@@ -132,15 +130,14 @@ def make_clean_csvs_to_db(base_path: str = BASE_PATH,
             # 예: 테이블명은 파일명에서 확장자 뺀 것으로 사용(원하면 규칙 변경 가능)
             table_name = os.path.splitext(filename)[0]
 
-            # 덮어쓰기 방식으로 DB에 저장
-            df_clean.to_sql(table_name, conn, if_exists='replace', index=False)
-            print(f"[완료] {filename} => DB 테이블 '{table_name}' 저장 (읽은 인코딩: {enc})")
+            # 시각 기준으로 추가/갱신 (같은 시각은 값만 바뀜)
+            stats = ingest_frame(df_clean, table_name, db_path)
+            print(f"[완료] {filename} => DB 테이블 '{table_name}' 저장 (읽은 인코딩: {enc}, "
+                  f"추가 {stats['inserted']}행, 갱신 {stats['updated']}행, 중복 시각 {stats['duplicates']}행 제외)")
 
         except Exception as e:
             print(f"[오류] {filename} 처리 실패: {e}")
 
-    conn.close()
-
 
 # bdf = pd.read_csv("data_cleaned/mc_clean.csv", encoding="utf-8-sig")
 # bdf.info()
@@ -0,0 +1,281 @@
+# timeseries_db.py
+# codefarmdb.sqlite 의 온실(파일)별 시계열 테이블 저장/조회
+#   - 테이블 하나 = 온실 하나 (테이블명은 기존처럼 파일명에서 확장자 뺀 것)
+#   - 시각 열(date_time, 없으면 첫 열)은 'YYYY-MM-DD HH:MM:SS' TEXT + UNIQUE 인덱스
+#   - 숫자 열은 REAL, 숫자로 바꿀 수 없는 값이 있는 열만 TEXT
+#   - 새 파일은 같은 시각이면 값만 갱신(upsert), 없는 시각은 추가 → 하루치 파일을 올려도 테이블을 다시 쓰지 않음
+#   - 연결은 precleaning.db 관리자 사용 (스레드별 읽기 연결, 쓰기는 하나씩) → 쓰는 동안에도 읽기는 안 막힘
+# 예전 방식(to_sql replace)으로 만든 인덱스 없는 테이블은 처음 ingest 할 때 새 스키마로 옮김
+# 테이블별 행 수/시각 범위는 META_TABLE 에 기록해 두고 TableHandle.count() 가 바로 읽음
+import numpy as np
+import pandas as pd
+from precleaning.db import DB_PATH, get_manager
+
+TIME_COLUMN = 'date_time'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+META_TABLE = '_timeseries_meta'
+CHUNK_SIZE = 50000
+MIN_TIME_RATIO = 0.5   # 시각으로 읽히는 행이 이 비율보다 적으면 시계열이 아닌 표로 보고 통째로 저장
+
+def time_column(columns):
+    columns = list(columns)
+    return TIME_COLUMN if TIME_COLUMN in columns else columns[0]
+
+
+# 여러 형식('2025-10-03 0:01', '2025-10-13 T 00:00', 자정의 '2025-10-04')을 TIME_FORMAT 문자열로
+def normalize_times(values):
+    text = pd.Series(values).astype('string').str.replace(' T ', ' ', regex=False)
+    times = pd.to_datetime(text, format='mixed', errors='coerce')
+    return times.dt.strftime(TIME_FORMAT)
+
+
+def _to_text(value):
+    return None if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)) else str(value)
+
+
+# 열별 SQLite 타입: 값이 모두 숫자로 읽히면 REAL, 아니면 TEXT
+def column_types(df, time_col):
+    types = {}
+    for col in df.columns:
+        if col == time_col:
+            types[col] = 'TEXT'
+            continue
+        values = df[col]
+        numeric = pd.to_numeric(values, errors='coerce')
+        types[col] = 'REAL' if numeric.notna().sum() == values.notna().sum() else 'TEXT'
+    return types
+
+
+def _table_info(conn, table):
+    return conn.execute(f"PRAGMA table_info([{table}]);").fetchall()
+
+
+# table 에 time_col 단독 UNIQUE 인덱스가 있는지
+def has_time_index(conn, table, time_col=None):
+    info = _table_info(conn, table)
+    if not info:
+        return False
+    time_col = time_col or time_column([row[1] for row in info])
+    for index in conn.execute(f"PRAGMA index_list([{table}]);").fetchall():
+        if not index[2]:  # unique
+            continue
+        cols = [row[2] for row in conn.execute(f"PRAGMA index_info([{index[1]}]);").fetchall()]
+        if cols == [time_col]:
+            return True
+    return False
+
+
+def _create_table(conn, table, types, time_col):
+    cols = ", ".join(f"[{col}] {kind}{' NOT NULL' if col == time_col else ''}" for col, kind in types.items())
+    conn.execute(f"CREATE TABLE [{table}] ({cols});")
+    conn.execute(f"CREATE UNIQUE INDEX [ux_{table}_{time_col}] ON [{table}]([{time_col}]);")
+
+
+def _upsert(conn, table, df, types, time_col):
+    cols = list(df.columns)
+    values = []
+    for col in cols:
+        if types.get(col) == 'REAL':
+            series = pd.to_numeric(df[col], errors='coerce').astype(float)
+            values.append([None if np.isnan(v) else v for v in series.to_numpy()])
+        else:
+            values.append([_to_text(v) for v in df[col].to_numpy(dtype=object)])
+    names = ", ".join(f"[{col}]" for col in cols)
+    updates = ", ".join(f"[{col}] = excluded.[{col}]" for col in cols if col != time_col)
+    sql = (f"INSERT INTO [{table}] ({names}) VALUES ({', '.join('?' * len(cols))}) "
+           f"ON CONFLICT([{time_col}]) DO " + (f"UPDATE SET {updates};" if updates else "NOTHING;"))
+    conn.executemany(sql, zip(*values))
+
+
+# DataFrame 을 시계열 테이블에 추가/갱신
+#   replace=True 면 기존 행을 모두 지우고 씀 (스키마와 인덱스는 유지)
+#   conn 을 주지 않으면 관리자의 쓰기 연결로 한 트랜잭션 안에서 씀
+# 반환: {'rows': 저장 행, 'inserted': 새 시각 수, 'updated': 기존 시각 수, 'dropped': 시각이 없어 버린 행,
+#        'duplicates': 같은 시각이 여러 번 나와 마지막 행만 남기고 버린 행, 'mode'}
+def ingest_frame(df, table, db_path=None, replace=False, conn=None):
+    if conn is None:
+        with get_manager(db_path).writer() as conn:
+            return _ingest(conn, df, table, replace)
+    return _ingest(conn, df, table, replace)
+
+
+def _ingest(conn, df, table, replace):
+    df = df.copy()
+    df.columns = [str(col) for col in df.columns]
+    time_col = time_column(df.columns)
+    stamps = normalize_times(df[time_col])
+    if len(df) and stamps.notna().mean() < MIN_TIME_RATIO:
+        # 시각 열이 없는 표: 예전처럼 통째로 저장
+        df.to_sql(table, conn, if_exists='replace', index=False)
+        _update_meta(conn, table, len(df))
+        conn.commit()
+        return {'rows': len(df), 'inserted': len(df), 'updated': 0, 'dropped': 0, 'duplicates': 0,
+                'mode': 'replace'}
+    df[time_col] = stamps
+    dropped = int(stamps.isna().sum())
+    df = df[stamps.notna().to_numpy()]
+    duplicates = int(df.duplicated(subset=time_col, keep='last').sum())
+    df = df.drop_duplicates(subset=time_col, keep='last')
+
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN;")  # 테이블 옮기기(DROP/CREATE)까지 한 트랜잭션으로
+        types = column_types(df, time_col)
+        info = _table_info(conn, table)
+        if info and not has_time_index(conn, table, time_col):
+            # 예전 to_sql 테이블 → 새 스키마로 옮긴 뒤 이어서 씀
+            if time_col not in [row[1] for row in info]:
+                raise ValueError(f"'{table}' 테이블에 시각 열 '{time_col}' 이 없습니다.")
+            legacy = pd.read_sql(f"SELECT * FROM [{table}];", conn)
+            conn.execute(f"DROP TABLE [{table}];")
+            info = []
+            if not replace:
+                legacy[time_col] = normalize_times(legacy[time_col])
+                legacy = legacy[legacy[time_col].notna().to_numpy()].drop_duplicates(subset=time_col, keep='last')
+                legacy_types = column_types(legacy, time_col)
+                merged = {**legacy_types, **{c: t for c, t in types.items() if c not in legacy_types}}
+                _create_table(conn, table, merged, time_col)
+                _upsert(conn, table, legacy, merged, time_col)
+                info = _table_info(conn, table)
+        if not info:
+            _create_table(conn, table, types, time_col)
+        else:
+            existing = {row[1]: row[2] for row in info}
+            for col in df.columns:
+                if col not in existing:
+                    conn.execute(f"ALTER TABLE [{table}] ADD COLUMN [{col}] {types[col]};")
+            # 기존 열 타입을 따름 (TEXT 열에 숫자가 와도 TEXT 로)
+            types = {col: existing.get(col, types[col]) for col in df.columns}
+            if replace:
+                conn.execute(f"DELETE FROM [{table}];")
+        before = conn.execute(f"SELECT COUNT(*) FROM [{table}];").fetchone()[0]
+        _upsert(conn, table, df, types, time_col)
+        after, first, last = conn.execute(
+            f"SELECT COUNT(*), MIN([{time_col}]), MAX([{time_col}]) FROM [{table}];").fetchone()
+        _update_meta(conn, table, after, first, last)
+    inserted = after - before
+    return {'rows': len(df), 'inserted': inserted, 'updated': len(df) - inserted, 'dropped': dropped,
+            'duplicates': duplicates, 'mode': 'replace' if replace else 'upsert'}
+
+
+# ingest 후 행 수와 시각 범위 기록 (같은 트랜잭션 안에서 호출)
+def _update_meta(conn, table, rows, first=None, last=None):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS [{META_TABLE}] "
+                 "(name TEXT PRIMARY KEY, rows INTEGER, first TEXT, last TEXT);")
+    conn.execute(f"INSERT INTO [{META_TABLE}] (name, rows, first, last) VALUES (?, ?, ?, ?) "
+                 "ON CONFLICT(name) DO UPDATE SET rows = excluded.rows, first = excluded.first, "
+                 "last = excluded.last;", (table, int(rows), first, last))
+
+
+def _bound(value):
+    return pd.Timestamp(value).strftime(TIME_FORMAT)
+
+
+# 기간 조회 (시각 인덱스 사용)
+#   start 이상, end 미만. columns 를 주면 시각 열 + 해당 열만 읽음
+#   시각 인덱스가 없는 예전 테이블은 문자열 비교 그대로, 저장 순서(rowid)로 반환
+def read_range(table, start=None, end=None, columns=None, db_path=None, conn=None, limit=None):
+    conn = conn or get_manager(db_path).reader()
+    info = _table_info(conn, table)
+    all_cols = [row[1] for row in info]
+    time_col = time_column(all_cols)
+    cols = [time_col] + [col for col in (columns or all_cols) if col != time_col]
+    where, params = [], []
+    if start is not None:
+        where.append(f"[{time_col}] >= ?")
+        params.append(_bound(start))
+    if end is not None:
+        where.append(f"[{time_col}] < ?")
+        params.append(_bound(end))
+    order = f"[{time_col}]" if has_time_index(conn, table, time_col) else "rowid"
+    sql = (f"SELECT {', '.join(f'[{col}]' for col in cols)} FROM [{table}]"
+           + (f" WHERE {' AND '.join(where)}" if where else "") + f" ORDER BY {order}"
+           + (f" LIMIT {int(limit)}" if limit else "") + ";")
+    return pd.read_sql(sql, conn, params=params)
+
+
+# (첫 시각, 마지막 시각, 행 수)
+def time_bounds(table, db_path=None, conn=None):
+    conn = conn or get_manager(db_path).reader()
+    time_col = time_column([row[1] for row in _table_info(conn, table)])
+    first, last, count = conn.execute(
+        f"SELECT MIN([{time_col}]), MAX([{time_col}]), COUNT(*) FROM [{table}];").fetchone()
+    return first, last, count
+
+
+# 테이블을 바로 읽지 않는 핸들. 미리보기/행 수는 작은 쿼리로, 전체 데이터는 to_frame() 할 때만 읽음
+#   preview(n)     : 끝 n 행 (시각 인덱스 역순, 없으면 rowid 역순 + LIMIT)
+#   count()        : META_TABLE 에 기록된 행 수 (ingest_frame 로 쓰지 않은 테이블은 COUNT(*))
+#   iter_chunks(n) : 시각(없으면 rowid) 기준 키셋 페이지로 n 행씩
+# 연결은 관리자의 현재 스레드 읽기 연결을 씀 (닫지 않음)
+class TableHandle:
+    def __init__(self, table, db_path=None):
+        self.table = table
+        self.db_path = db_path
+        self._columns = None
+        self._order = None
+
+    def _connect(self):
+        return get_manager(self.db_path).reader()
+
+    def _meta(self, conn):
+        info = _table_info(conn, self.table)
+        if not info:
+            raise ValueError(f"'{self.table}' 테이블이 없습니다.")
+        self._columns = [row[1] for row in info]
+        time_col = time_column(self._columns)
+        self._order = time_col if has_time_index(conn, self.table, time_col) else 'rowid'
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._meta(self._connect())
+        return self._columns
+
+    def count(self):
+        conn = self._connect()
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;",
+                              (META_TABLE,)).fetchone()
+        row = conn.execute(f"SELECT rows FROM [{META_TABLE}] WHERE name = ?;",
+                           (self.table,)).fetchone() if exists else None
+        if row is not None:
+            return int(row[0])
+        return int(conn.execute(f"SELECT COUNT(*) FROM [{self.table}];").fetchone()[0])
+
+    def preview(self, n=5):
+        conn = self._connect()
+        self._meta(conn)
+        df = pd.read_sql(f"SELECT * FROM [{self.table}] ORDER BY [{self._order}] DESC LIMIT {int(n)};", conn)
+        return df.iloc[::-1].reset_index(drop=True)
+
+    def to_frame(self, start=None, end=None, columns=None):
+        return read_range(self.table, start, end, columns, self.db_path)
+
+    def iter_chunks(self, chunksize=CHUNK_SIZE, columns=None):
+        conn = self._connect()
+        self._meta(conn)
+        cols = ", ".join(f"[{col}]" for col in (columns or self._columns))
+        key = f"[{self._order}]" if self._order != 'rowid' else 'rowid'
+        last = None
+        while True:
+            where = f" WHERE {key} > ?" if last is not None else ""
+            chunk = pd.read_sql(f"SELECT {key} AS _key, {cols} FROM [{self.table}]{where} "
+                                f"ORDER BY {key} LIMIT {int(chunksize)};", conn,
+                                params=[last] if last is not None else [])
+            if chunk.empty:
+                return
+            last = chunk['_key'].iloc[-1]
+            last = last.item() if hasattr(last, 'item') else last
+            yield chunk.drop(columns='_key')
+            if len(chunk) < chunksize:
+                return
+
+
+if __name__ == "__main__":
+    import sys
+    from precleaning.incoding import read_csv_robust, clean_for_analysis
+    path = sys.argv[1] if len(sys.argv) > 1 else 'data/priva.csv'
+    df_raw, enc = read_csv_robust(path)
+    table = path.replace('\\', '/').rsplit('/', 1)[-1].rsplit('.', 1)[0]
+    print(ingest_frame(clean_for_analysis(df_raw), table))
+    print(time_bounds(table))
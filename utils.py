@@ -1,6 +1,32 @@
 # utils.py
+import os
+from contextlib import contextmanager
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
 def get_korea_time():
-    return datetime.now(ZoneInfo("Asia/Seoul"))
\ No newline at end of file
+    return datetime.now(ZoneInfo("Asia/Seoul"))
+
+class LockBusy(Exception):
+    pass
+
+# 프로세스 사이에서 하나만 실행되도록 잡는 파일 잠금 (프로세스가 죽으면 OS 가 자동으로 풀어 줌)
+# blocking=False 면 이미 잠겨 있을 때 기다리지 않고 LockBusy
+@contextmanager
+def file_lock(path, blocking=True):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    f = open(path, 'a+')
+    try:
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            raise LockBusy(path)
+        yield f
+    finally:
+        f.close()